@@ -1,5 +1,11 @@
 # app/auth.py
+import hashlib
+import hmac
 import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -11,26 +17,83 @@ JWT_SECRET = os.getenv("JWT_SECRET", "CHANGE_ME_SUPER_SECRET")
 JWT_ALG = "HS256"
 JWT_EXPIRE_MIN = int(os.getenv("JWT_EXPIRE_MIN", "60"))
 
+# Cache de tokens ya verificados (el dashboard repite el mismo token en cada llamada)
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "1024"))
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "300"))  # 0 = sin cache
+
 ADMIN_USER = os.getenv("ADMIN_USER", "admin")
 ADMIN_PASS = os.getenv("ADMIN_PASS", "mtcolectivo123")  # máx. 72 no aplica a pbkdf2, pero mantenlo razonable
 
 # Usamos pbkdf2_sha256 para evitar problemas de bcrypt en Docker
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
-# Si viene un hash ya calculado por env, úsalo. Si no, hachea ADMIN_PASS al arrancar.
-ADMIN_PASS_HASH = os.getenv("ADMIN_PASS_HASH")
-if not ADMIN_PASS_HASH:
-    ADMIN_PASS_HASH = pwd_context.hash(ADMIN_PASS)
+# Si viene un hash ya calculado por env, úsalo (python -m app.auth lo genera).
+# Si no, se calcula en el primer login (no al importar) y se guarda en
+# ADMIN_HASH_FILE para los siguientes arranques.
+ADMIN_PASS_HASH = os.getenv("ADMIN_PASS_HASH") or None
+ADMIN_HASH_FILE = os.getenv(
+    "ADMIN_HASH_FILE",
+    os.path.join(tempfile.gettempdir(), "mtcolectivo_admin_hash"),
+)
+
+_admin_hash_lock = threading.Lock()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def _admin_fingerprint() -> str:
+    # Identifica usuario/contraseña/secreto sin guardar la contraseña en claro
+    message = f"{ADMIN_USER}:{ADMIN_PASS}".encode("utf-8")
+    return hmac.new(JWT_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def _load_admin_hash() -> Optional[str]:
+    try:
+        with open(ADMIN_HASH_FILE, "r", encoding="utf-8") as f:
+            fingerprint, hashed = f.read().split("\n", 1)
+    except (OSError, ValueError):
+        return None
+    hashed = hashed.strip()
+    if fingerprint.strip() != _admin_fingerprint() or not hashed:
+        return None  # cambió ADMIN_PASS (o el secreto): se recalcula
+    return hashed
+
+
+def _store_admin_hash(hashed: str) -> None:
+    tmp = f"{ADMIN_HASH_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f"{_admin_fingerprint()}\n{hashed}\n")
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, ADMIN_HASH_FILE)
+    except OSError:
+        # Disco de solo lectura: queda solo en memoria
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def get_admin_hash() -> str:
+    global ADMIN_PASS_HASH
+    if ADMIN_PASS_HASH:
+        return ADMIN_PASS_HASH
+    with _admin_hash_lock:
+        if not ADMIN_PASS_HASH:
+            hashed = _load_admin_hash()
+            if hashed is None:
+                hashed = pwd_context.hash(ADMIN_PASS)
+                _store_admin_hash(hashed)
+            ADMIN_PASS_HASH = hashed
+    return ADMIN_PASS_HASH
+
+
 def authenticate(username: str, password: str) -> bool:
     if username != ADMIN_USER:
         return False
-    return verify_password(password, ADMIN_PASS_HASH)
+    return verify_password(password, get_admin_hash())
 
 
 def create_token(sub: str) -> str:
@@ -43,8 +106,147 @@ def create_token(sub: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
 
-def decode_token(token: str) -> Optional[dict]:
+def _verify_token(token: str) -> Optional[dict]:
     try:
         return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+# ================================
+# Cache de tokens verificados
+# ================================
+
+class TokenCache:
+    """
+    LRU acotado de claims ya verificados, por sha256 del token.
+
+    - Una entrada nunca se sirve después de su `exp` (ni de JWT_CACHE_TTL).
+    - Solo se guardan tokens válidos; los inválidos se verifican siempre.
+    - Si cambia JWT_SECRET se vacía completo.
+    """
+
+    def __init__(self, max_entries: int = JWT_CACHE_MAX, ttl: float = JWT_CACHE_TTL):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._secret = JWT_SECRET
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.clears = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _check_secret(self) -> None:
+        # Llamar con el lock tomado
+        if self._secret != JWT_SECRET:
+            self._entries.clear()
+            self._secret = JWT_SECRET
+            self.clears += 1
+
+    def get(self, key: bytes) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            self._check_secret()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            claims, valid_until = entry
+            if now >= valid_until:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(claims)
+
+    def put(self, key: bytes, claims: dict, secret: str) -> None:
+        now = time.time()
+        valid_until = now + self.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            try:
+                valid_until = min(valid_until, float(exp))
+            except (TypeError, ValueError):
+                return
+        if valid_until <= now:
+            return
+
+        with self._lock:
+            self._check_secret()
+            # Verificado con un secreto que ya rotó → no se guarda
+            if secret != self._secret:
+                return
+            self._entries[key] = (dict(claims), valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._secret = JWT_SECRET
+            self.clears += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "clears": self.clears,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+_token_cache = TokenCache()
+
+
+def get_token_cache() -> TokenCache:
+    return _token_cache
+
+
+def set_jwt_secret(secret: str) -> None:
+    """Rota el secreto en caliente; los tokens cacheados dejan de valer."""
+    global JWT_SECRET
+    JWT_SECRET = secret
+    _token_cache.clear()
+
+
+def decode_token(token: str) -> Optional[dict]:
+    cache = _token_cache
+    if not cache.enabled:
+        return _verify_token(token)
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = cache.get(key)
+    if claims is not None:
+        return claims
+
+    secret = JWT_SECRET
+    claims = _verify_token(token)
+    if claims is not None:
+        cache.put(key, claims, secret)
+    return claims
+
+
+if __name__ == "__main__":
+    # Hash para ADMIN_PASS_HASH (evita calcularlo en cada arranque)
+    print(pwd_context.hash(ADMIN_PASS))
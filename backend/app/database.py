@@ -5,24 +5,67 @@ from sqlalchemy.orm import sessionmaker, DeclarativeBase
 # Toma DATABASE_URL de entorno o usa SQLite local
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-# Si viene como postgresql:// lo convertimos para SQLAlchemy
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace(
-        "postgresql://",
-        "postgresql+psycopg2://",
-        1
-    )
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={
-        "sslmode": "require"
-    } if DATABASE_URL.startswith("postgresql") else {
-        "check_same_thread": False
-    },
-)
+# Réplica opcional para lecturas (GET de órdenes / stats / precios)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+
+# ==== Pool ====
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Railway cierra conexiones inactivas: reciclar antes y verificar al sacar del pool
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False")
+# Solo PostgreSQL; 0 = sin límite
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+
+def _normalize_url(url: str) -> str:
+    # Si viene como postgresql:// lo convertimos para SQLAlchemy
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    return url
+
+
+def _make_engine(url: str, read_only: bool = False):
+    if url.startswith("postgresql"):
+        options = []
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+        if read_only:
+            options.append("-c default_transaction_read_only=on")
+
+        connect_args = {"sslmode": "require"}
+        if options:
+            connect_args["options"] = " ".join(options)
+    else:
+        connect_args = {"check_same_thread": False}
+
+    kwargs = {
+        "connect_args": connect_args,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    # SQLite en memoria usa un pool sin tamaño
+    if ":memory:" not in url and url != "sqlite://":
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return create_engine(url, **kwargs)
+
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+engine = _make_engine(DATABASE_URL)
+
+if DATABASE_READ_URL:
+    DATABASE_READ_URL = _normalize_url(DATABASE_READ_URL)
+    read_engine = _make_engine(DATABASE_READ_URL, read_only=True)
+else:
+    read_engine = engine
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
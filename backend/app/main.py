@@ -1,15 +1,31 @@
-from fastapi import FastAPI
+from app.services import startup_report  # primero: mide el resto de imports
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
-from app.routers import pdf, orders, auth
+from fastapi.responses import ORJSONResponse
+startup_report.mark("fastapi")
+from app.database import engine, SessionLocal
+from app.migrations import run_migrations
+startup_report.mark("database + models")
+from app.routers import pdf, orders, auth, quotes
 from app.routers.orders import public_router, private_router
 from app.routers.prices import price_router, seed_router
+startup_report.mark("routers")
+from app.services.converter_pool import shutdown_converter_pool
+from app.services.render_executor import shutdown_render_executor
+from app.services.submission_queue import start_submission_worker, stop_submission_worker
+from app.services import rollup
+from app.pdf_utils import get_compiled_template
+from app.deps import get_current_user
+startup_report.mark("services")
 
 app = FastAPI(
     title="MT Colectivo API",
     docs_url="/secret-docs",
     redoc_url=None,
-    openapi_url="/secret-openapi.json"
+    openapi_url="/secret-openapi.json",
+    # orjson para todas las respuestas JSON
+    default_response_class=ORJSONResponse,
 )
 
 # =======================
@@ -18,8 +34,38 @@ app = FastAPI(
 
 @app.on_event("startup")
 def on_startup():
-    # Crea las tablas si no existen (PostgreSQL)
-    Base.metadata.create_all(bind=engine)
+    # Migraciones versionadas pendientes (SQLite / PostgreSQL)
+    with startup_report.step("migrations"):
+        run_migrations(engine)
+
+    # Rollup diario: se construye la primera vez (tabla vacía con órdenes)
+    with startup_report.step("rollup"):
+        db = SessionLocal()
+        try:
+            rollup.ensure_built(db)
+        finally:
+            db.close()
+
+    # Worker de la cola de form-submit (solo con FORM_SUBMIT_MODE=queue)
+    with startup_report.step("submission_worker"):
+        start_submission_worker()
+
+    # Precompila la plantilla de órdenes (se recarga sola si cambia)
+    with startup_report.step("template"):
+        try:
+            get_compiled_template()
+        except FileNotFoundError:
+            pass
+
+    startup_report.ready()
+    print(startup_report.summary())
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Cierra el worker de la cola, el executor de render y los workers de LibreOffice
+    stop_submission_worker()
+    shutdown_render_executor()
+    shutdown_converter_pool()
 
 # =======================
 # ROUTERS
@@ -40,6 +86,7 @@ app.include_router(seed_router)
 # 🔐 PRIVADO
 app.include_router(private_router)
 app.include_router(orders.private_router)
+app.include_router(quotes.router)
 
 # =======================
 # CORS
@@ -54,6 +101,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Price-Version"],
 )
 
 # =======================
@@ -62,4 +110,9 @@ app.add_middleware(
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/health/startup")
+def startup_timing(user: str = Depends(get_current_user)):
+    # Desglose del arranque en frío (imports + init)
+    return startup_report.report()
@@ -0,0 +1,255 @@
+# app/migrations.py
+"""
+Migraciones versionadas (SQLite y PostgreSQL).
+
+Cada migración corre en su propia transacción y queda registrada en
+schema_migrations; al arrancar solo se aplican las pendientes.
+Para agregar una: función nueva + entrada al final de MIGRATIONS con el
+siguiente número (nunca renumerar las ya publicadas).
+
+Uso manual:  python -m app.migrations
+"""
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.database import Base, engine as default_engine
+from app.models import (
+    FormSubmission, IdempotencyKey, Order, OrderDestinoCount, PriceVersion,
+    PriceVersionItem, Service, ServicePrice, TableVersion,
+)
+
+_meta = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Respaldo de los precios duplicados que borró la migración 4 (solo se
+# crea ahí, no en bases nuevas)
+_backup_meta = MetaData()
+
+service_prices_removed = Table(
+    "service_prices_removed",
+    _backup_meta,
+    Column("id", Integer, primary_key=True),
+    Column("service_id", Integer),
+    Column("capacidad", Integer),
+    Column("period", String),
+    Column("price_normal", Float),
+    Column("price_discount", Float),
+    Column("kept_id", Integer),
+    Column("removed_at", DateTime, nullable=False),
+)
+
+# Llave del advisory lock de Postgres (varios workers arrancando a la vez)
+_PG_LOCK_KEY = 7_240_013
+
+
+# ================================
+# Migraciones
+# ================================
+
+def _baseline(conn: Connection) -> None:
+    # Tablas que falten (en una base nueva: todo el esquema actual)
+    Base.metadata.create_all(bind=conn)
+
+
+def _orders_service_id(conn: Connection) -> None:
+    # Antes lo hacía GET /orders/fix-db (solo Postgres)
+    columns = {c["name"] for c in inspect(conn).get_columns("orders")}
+    if "service_id" not in columns:
+        conn.execute(text("ALTER TABLE orders ADD COLUMN service_id INTEGER"))
+
+    # SQLite no permite agregar FKs con ALTER TABLE
+    if conn.dialect.name == "postgresql":
+        fks = inspect(conn).get_foreign_keys("orders")
+        if not any(fk["referred_table"] == "services" for fk in fks):
+            conn.execute(text(
+                "ALTER TABLE orders ADD CONSTRAINT fk_orders_service "
+                "FOREIGN KEY (service_id) REFERENCES services(id)"
+            ))
+
+
+def _hot_query_indexes(conn: Connection) -> None:
+    # orders(created_at / service_id / dir_destino), services(active)
+    for table in (Order.__table__, Service.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _unique_service_prices(conn: Connection) -> None:
+    # Duplicados: se queda el de id más bajo (el que ya usaba el PricingEngine).
+    # Antes de borrar se copian a service_prices_removed y se listan en el log.
+    removed_at = datetime.utcnow()
+    service_prices_removed.create(conn, checkfirst=True)
+    conn.execute(text("""
+        INSERT INTO service_prices_removed
+            (id, service_id, capacidad, period, price_normal, price_discount, kept_id, removed_at)
+        SELECT
+            sp.id, sp.service_id, sp.capacidad, sp.period, sp.price_normal, sp.price_discount,
+            (
+                SELECT MIN(k.id) FROM service_prices k
+                WHERE k.service_id = sp.service_id
+                  AND k.period = sp.period
+                  AND (k.capacidad = sp.capacidad OR (k.capacidad IS NULL AND sp.capacidad IS NULL))
+            ),
+            :removed_at
+        FROM service_prices sp
+        WHERE sp.id NOT IN (
+            SELECT MIN(id) FROM service_prices
+            GROUP BY service_id, capacidad, period
+        )
+    """), {"removed_at": removed_at})
+
+    removed = conn.execute(
+        select(service_prices_removed).where(service_prices_removed.c.removed_at == removed_at)
+    ).all()
+    if removed:
+        print(f"⚠️ service_prices: {len(removed)} duplicado(s) respaldados en service_prices_removed y borrados")
+        for row in removed:
+            print(
+                f"   id={row.id} service_id={row.service_id} capacidad={row.capacidad} "
+                f"period={row.period} price_normal={row.price_normal} "
+                f"price_discount={row.price_discount} (se conserva id={row.kept_id})"
+            )
+
+    conn.execute(text("""
+        DELETE FROM service_prices
+        WHERE id IN (SELECT id FROM service_prices_removed WHERE removed_at = :removed_at)
+    """), {"removed_at": removed_at})
+    for index in ServicePrice.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _form_submissions(conn: Connection) -> None:
+    FormSubmission.__table__.create(conn, checkfirst=True)
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+def _table_versions(conn: Connection) -> None:
+    TableVersion.__table__.create(conn, checkfirst=True)
+    # Filas desde ya: así el bump es un UPDATE simple
+    existing = set(conn.execute(select(TableVersion.name)).scalars())
+    missing = [
+        {"name": name, "version": 1}
+        for name in ("orders", "services", "service_prices")
+        if name not in existing
+    ]
+    if missing:
+        conn.execute(TableVersion.__table__.insert(), missing)
+
+
+def _price_versions(conn: Connection) -> None:
+    PriceVersion.__table__.create(conn, checkfirst=True)
+    PriceVersionItem.__table__.create(conn, checkfirst=True)
+
+    columns = {c["name"] for c in inspect(conn).get_columns("orders")}
+    if "price_version_id" not in columns:
+        conn.execute(text("ALTER TABLE orders ADD COLUMN price_version_id INTEGER"))
+
+    exists = conn.execute(select(TableVersion.name).where(TableVersion.name == "price_versions")).first()
+    if exists is None:
+        conn.execute(TableVersion.__table__.insert().values(name="price_versions", version=1))
+
+
+def _order_destino_counts(conn: Connection) -> None:
+    OrderDestinoCount.__table__.create(conn, checkfirst=True)
+    conn.execute(text("""
+        INSERT INTO order_destino_counts (destino, orders)
+        SELECT COALESCE(dir_destino, ''), COUNT(id)
+        FROM orders
+        GROUP BY COALESCE(dir_destino, '')
+    """))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "orders_service_id", _orders_service_id),
+    (3, "hot_query_indexes", _hot_query_indexes),
+    (4, "unique_service_prices", _unique_service_prices),
+    (5, "form_submissions", _form_submissions),
+    (6, "idempotency_keys", _idempotency_keys),
+    (7, "table_versions", _table_versions),
+    (8, "price_versions", _price_versions),
+    (9, "order_destino_counts", _order_destino_counts),
+]
+
+
+# ================================
+# Runner
+# ================================
+
+def _lock(conn: Connection) -> None:
+    # Hasta el fin de la transacción; en SQLite no hace falta
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _PG_LOCK_KEY})
+
+
+def _applied(conn: Connection) -> set:
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def _recorded_versions(bind: Engine) -> Optional[set]:
+    # None = todavía no existe schema_migrations
+    try:
+        with bind.connect() as conn:
+            return _applied(conn)
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def run_migrations(bind: Engine = default_engine) -> List[int]:
+    """
+    Aplica las migraciones pendientes. Devuelve las versiones aplicadas.
+    Con el esquema al día es una sola consulta (sin inspeccionar tablas).
+    """
+    applied = _recorded_versions(bind)
+    if applied is None:
+        # Bajo el lock: otra réplica arrancando a la vez ya no choca al crearla
+        with bind.begin() as conn:
+            _lock(conn)
+            _meta.create_all(bind=conn)
+        applied = set()
+
+    if all(version in applied for version, _, _ in MIGRATIONS):
+        return []
+
+    done = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with bind.begin() as conn:
+            _lock(conn)
+            # Otro worker pudo aplicarla mientras esperábamos el lock
+            if conn.dialect.name == "postgresql" and version in _applied(conn):
+                continue
+
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.utcnow(),
+            ))
+        done.append(version)
+
+    return done
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    if applied:
+        print(f"✅ Migraciones aplicadas: {applied}")
+    else:
+        print("✅ Esquema al día")
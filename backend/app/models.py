@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base  
@@ -8,14 +8,14 @@ class Order(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    service_id = Column(Integer, ForeignKey("services.id"))
+    service_id = Column(Integer, ForeignKey("services.id"), index=True)
     service = relationship("Service")
 
     # datos generales
     nombre = Column(String, nullable=True)
     fecha = Column(String, nullable=True)
     dir_salida = Column(String, nullable=True)
-    dir_destino = Column(String, nullable=True)
+    dir_destino = Column(String, nullable=True, index=True)
     hor_ida = Column(String, nullable=True)
     hor_regreso = Column(String, nullable=True)
 
@@ -32,7 +32,10 @@ class Order(Base):
 
     texto_extra = Column(Text, nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Versión de tarifas con la que se cotizó (None = tarifas sin versionar / subtotal manual)
+    price_version_id = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class Service(Base):
@@ -41,13 +44,17 @@ class Service(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     slug = Column(String, unique=True, nullable=False)
-    active = Column(Boolean, default=True)
+    active = Column(Boolean, default=True, index=True)
 
     prices = relationship("ServicePrice", back_populates="service")
 
 
 class ServicePrice(Base):
     __tablename__ = "service_prices"
+    __table_args__ = (
+        # Búsqueda del PricingEngine + una sola tarifa por combinación
+        Index("uq_service_prices_lookup", "service_id", "capacidad", "period", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     service_id = Column(Integer, ForeignKey("services.id"))
@@ -56,4 +63,108 @@ class ServicePrice(Base):
     capacidad = Column(Integer)
     period = Column(String)  # morning / afternoon / full_day
     price_normal = Column(Float)
-    price_discount = Column(Float)
\ No newline at end of file
+    price_discount = Column(Float)
+
+class OrderDailyRollup(Base):
+    """
+    Agregados diarios de órdenes por servicio y capacidad.
+    Se mantiene incrementalmente en la misma transacción que cada
+    escritura de órdenes (ver app/services/rollup.py).
+    service_id / capacidad = 0 cuando la orden no los tiene.
+    """
+    __tablename__ = "order_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    service_id = Column(Integer, primary_key=True, default=0)
+    capacidad = Column(Integer, primary_key=True, default=0)
+
+    orders = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0)
+    descuento = Column(Float, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0)
+    abonado = Column(Float, nullable=False, default=0)
+    liquidar = Column(Float, nullable=False, default=0)
+
+
+class OrderDestinoCount(Base):
+    """
+    Órdenes por dir_destino ('' = sin destino). Se mantiene junto con
+    order_daily_rollup para que /orders/stats no agrupe sobre orders.
+    """
+    __tablename__ = "order_destino_counts"
+
+    destino = Column(String, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0, index=True)
+
+
+class FormSubmission(Base):
+    """
+    Cola durable de /orders/form-submit en modo "queue".
+    El id es el ticket que recibe el cliente.
+    status: pending → done | error
+    """
+    __tablename__ = "form_submissions"
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)
+
+    order_id = Column(Integer, nullable=True)
+    result = Column(Text, nullable=True)     # JSON de la respuesta de form-submit
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+
+class IdempotencyKey(Base):
+    """
+    Respuestas ya entregadas por form-submit, por llave de idempotencia
+    (sha256 del header Idempotency-Key o del payload).
+    Se escribe en la misma transacción que la orden / el ticket.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class TableVersion(Base):
+    """
+    Contador por tabla para ETags (GET /orders, /service-prices, ...).
+    Cada escritura lo incrementa en su misma transacción.
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class PriceVersion(Base):
+    """
+    Versión publicada de las tarifas: foto inmutable de service_prices.
+    Rige la de effective_from más reciente que ya pasó.
+    """
+    __tablename__ = "price_versions"
+
+    id = Column(Integer, primary_key=True)
+    label = Column(String, nullable=True)
+    effective_from = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    items = relationship("PriceVersionItem", cascade="all, delete-orphan")
+
+
+class PriceVersionItem(Base):
+    __tablename__ = "price_version_items"
+
+    version_id = Column(Integer, ForeignKey("price_versions.id", ondelete="CASCADE"), primary_key=True)
+    service_id = Column(Integer, primary_key=True)
+    capacidad = Column(Integer, primary_key=True)
+    period = Column(String, primary_key=True)
+    price_normal = Column(Float, nullable=True)
+    price_discount = Column(Float, nullable=True)
+    # id del ServicePrice de origen: conserva el orden del fallback por capacidad
+    price_id = Column(Integer, nullable=False)
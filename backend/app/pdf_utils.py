@@ -1,15 +1,107 @@
 from fastapi.responses import StreamingResponse, PlainTextResponse
-from docx import Document
 from io import BytesIO
 from zipfile import ZipFile, ZIP_DEFLATED
-import re, os, tempfile, subprocess
-import pandas as pd
-from docxcompose.composer import Composer
+import re, os, struct, zlib
+from app.services.converter_pool import get_converter_pool
 
 TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "../PlantillaOrden.docx")
 
 # ---------- Utilidades DOCX ----------
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_OF_CENTRAL_DIR = struct.Struct("<4s4H2LH")
+
+class RawDocxTemplate:
+    """
+    Zip de la plantilla con los miembros ya comprimidos (bytes crudos +
+    CRC + tamaños). Para armar un DOCX solo se comprime el XML nuevo y se
+    escribe el directorio central; el resto se copia tal cual.
+    """
+
+    def __init__(self, original_bytes: bytes, path: str = "word/document.xml"):
+        self.path = path
+        self.entries = []      # [(zinfo, name_bytes, record_bytes)]
+        self.target = None     # índice del miembro a reemplazar
+
+        view = memoryview(original_bytes)
+        with ZipFile(BytesIO(original_bytes), "r") as z:
+            for info in z.infolist():
+                if info.flag_bits & 0x1 or max(info.file_size, info.compress_size, info.header_offset) >= 0xFFFFFFFF:
+                    raise ValueError("Zip cifrado o ZIP64 no soportado")
+
+                start = info.header_offset
+                fields = _LOCAL_HEADER.unpack_from(view, start)
+                name_len, extra_len = fields[9], fields[10]
+                name = bytes(view[start + 30:start + 30 + name_len])
+                data_start = start + 30 + name_len + extra_len
+
+                if info.filename == path:
+                    self.target = len(self.entries)
+                    record = b""
+                else:
+                    raw = view[data_start:data_start + info.compress_size]
+                    record = self._local_header(info, name, info.CRC, info.compress_size, info.file_size, info.compress_type) + raw.tobytes()
+                self.entries.append((info, name, record))
+
+        if self.target is None:
+            raise KeyError(f"{path} no existe en la plantilla")
+
+    @staticmethod
+    def _dos_time(info):
+        y, mo, d, h, mi, sec = info.date_time
+        return (h << 11) | (mi << 5) | (sec // 2), ((y - 1980) << 9) | (mo << 5) | d
+
+    def _local_header(self, info, name, crc, csize, usize, method) -> bytes:
+        dostime, dosdate = self._dos_time(info)
+        return _LOCAL_HEADER.pack(
+            b"PK\x03\x04", max(info.extract_version, 20), info.flag_bits & ~0x08,
+            method, dostime, dosdate, crc, csize, usize, len(name), 0,
+        ) + name
+
+    def build(self, updated_xml: bytes) -> bytes:
+        target_info, target_name, _ = self.entries[self.target]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        data = compressor.compress(updated_xml) + compressor.flush()
+        crc = zlib.crc32(updated_xml)
+        target_record = self._local_header(target_info, target_name, crc, len(data), len(updated_xml), ZIP_DEFLATED) + data
+
+        out = []
+        central = []
+        offset = 0
+        for i, (info, name, record) in enumerate(self.entries):
+            if i == self.target:
+                record = target_record
+                entry_crc, csize, usize, method = crc, len(data), len(updated_xml), ZIP_DEFLATED
+            else:
+                entry_crc, csize, usize, method = info.CRC, info.compress_size, info.file_size, info.compress_type
+
+            dostime, dosdate = self._dos_time(info)
+            central.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", (info.create_system << 8) | info.create_version,
+                max(info.extract_version, 20), info.flag_bits & ~0x08, method,
+                dostime, dosdate, entry_crc, csize, usize,
+                len(name), len(info.extra), len(info.comment), 0,
+                info.internal_attr, info.external_attr, offset,
+            ) + name + info.extra + info.comment)
+
+            out.append(record)
+            offset += len(record)
+
+        central_bytes = b"".join(central)
+        out.append(central_bytes)
+        out.append(_END_OF_CENTRAL_DIR.pack(
+            b"PK\x05\x06", 0, 0, len(self.entries), len(self.entries),
+            len(central_bytes), offset, 0,
+        ))
+        return b"".join(out)
+
 def rebuild_docx(original_bytes: bytes, updated_xml: bytes, path="word/document.xml") -> bytes:
+    try:
+        return RawDocxTemplate(original_bytes, path).build(updated_xml)
+    except ValueError:
+        pass
+
+    # Zips raros (cifrados / ZIP64): reescritura completa
     in_buf = BytesIO(original_bytes)
     out_buf = BytesIO()
     with ZipFile(in_buf, "r") as zin, ZipFile(out_buf, "w", compression=ZIP_DEFLATED) as zout:
@@ -51,29 +143,88 @@ def fill_docx_with_mapping(template_bytes: bytes, mapping: dict) -> bytes:
     xml_new = tolerant_replace(xml, mapping)
     return rebuild_docx(template_bytes, xml_new.encode("utf-8"))
 
-def docx_to_pdf_bytes(docx_bytes: bytes) -> bytes:
-    with tempfile.TemporaryDirectory() as td:
-        in_path = os.path.join(td, "tmp.docx")
-        out_dir = td
-        with open(in_path, "wb") as f:
-            f.write(docx_bytes)
-
-        cmd = [
-            "soffice", "--headless", "--nologo", "--nolockcheck",
-            "--convert-to", "pdf", "--outdir", out_dir, in_path
-        ]
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+# ---------- Plantilla compilada ----------
+_SLOT_RE = re.compile(r"\x00(\d+)\x00")
+
+def _xml_escape(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+class CompiledTemplate:
+    """
+    document.xml precompilado: segmentos literales + posición de cada
+    &TOKEN& (incluidos los partidos entre <w:r>). Llenar = unir segmentos
+    con los valores escapados, sin regex por request.
+
+    Las posiciones se obtienen corriendo tolerant_replace UNA vez con
+    marcadores, así el resultado es idéntico al de tolerant_replace.
+    """
+
+    def __init__(self, template_bytes: bytes, version: str = ""):
+        self.template_bytes = template_bytes
+        self.version = version
+        with ZipFile(BytesIO(template_bytes), "r") as z:
+            self.xml = z.read("word/document.xml").decode("utf-8", errors="ignore")
+        self._compiled = {}
+
+        try:
+            self._raw = RawDocxTemplate(template_bytes)
+        except ValueError:
+            self._raw = None
+
+    def _compile(self, keys: tuple):
+        markers = {k: f"\x00{i}\x00" for i, k in enumerate(keys)}
+        parts = _SLOT_RE.split(tolerant_replace(self.xml, markers))
+        # parts = [literal, slot, literal, slot, ..., literal]
+        literals = tuple(parts[0::2])
+        slots = tuple(keys[int(i)] for i in parts[1::2])
+        return literals, slots
+
+    def render_xml(self, mapping: dict) -> str:
+        # El orden de las llaves importa (reemplazo secuencial): se compila por orden
+        keys = tuple(mapping)
+        compiled = self._compiled.get(keys)
+        if compiled is None:
+            compiled = self._compiled[keys] = self._compile(keys)
 
-        pdf_path = os.path.join(out_dir, "tmp.pdf")
-        with open(pdf_path, "rb") as f:
-            return f.read()
+        literals, slots = compiled
+        out = [literals[0]]
+        for key, literal in zip(slots, literals[1:]):
+            out.append(_xml_escape(mapping[key]))
+            out.append(literal)
+        return "".join(out)
+
+    def fill(self, mapping: dict) -> bytes:
+        xml = self.render_xml(mapping).encode("utf-8")
+        if self._raw is not None:
+            return self._raw.build(xml)
+        return rebuild_docx(self.template_bytes, xml)
+
+_templates = {}
+
+def get_compiled_template(path: str = TEMPLATE_PATH) -> CompiledTemplate:
+    """
+    Plantilla compilada cacheada; se recarga sola si el archivo cambia
+    (mtime/tamaño).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró la plantilla en {path}")
+
+    st = os.stat(path)
+    version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    tpl = _templates.get(path)
+    if tpl is None or tpl.version != version:
+        with open(path, "rb") as f:
+            tpl = CompiledTemplate(f.read(), version)
+        _templates[path] = tpl
+    return tpl
+
+def docx_to_pdf_bytes(docx_bytes: bytes) -> bytes:
+    # Conversión en el pool de LibreOffice de larga vida (perfil por worker)
+    return get_converter_pool().convert(docx_bytes)
 
 def generate_pdf_from_template(mapping: dict) -> bytes:
-    if not os.path.exists(TEMPLATE_PATH):
-        raise FileNotFoundError(f"No se encontró la plantilla en {TEMPLATE_PATH}")
-    with open(TEMPLATE_PATH, "rb") as f:
-        tpl_bytes = f.read()
-    filled_docx = fill_docx_with_mapping(tpl_bytes, mapping)
+    filled_docx = get_compiled_template(TEMPLATE_PATH).fill(mapping)
     return docx_to_pdf_bytes(filled_docx)
 
 # ---------- Normalización desde Excel ----------
@@ -102,6 +253,8 @@ def build_mapping_from_row(row: dict) -> dict:
     return mapping
 
 def read_first_row_from_excel(file_bytes: bytes, sheet_name: str | None = None) -> dict:
+    import pandas as pd  # pesado: solo cuando se usa
+
     with BytesIO(file_bytes) as bio:
         df = pd.read_excel(bio, sheet_name=sheet_name)
     if df.empty:
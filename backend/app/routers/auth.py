@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
-from app.auth import authenticate as authenticate_user, create_token as create_access_token
+from app.auth import authenticate as authenticate_user, create_token as create_access_token, get_token_cache
 from app.deps import get_current_user  # opcional para /me
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -28,4 +28,9 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @router.get("/me", response_model=MeResponse)
 def me(user: str = Depends(get_current_user)):
-    return MeResponse(username=user)
\ No newline at end of file
+    return MeResponse(username=user)
+
+@router.get("/token-cache")
+def token_cache_stats(user: str = Depends(get_current_user)):
+    # Hits / misses del cache de tokens verificados
+    return get_token_cache().stats()
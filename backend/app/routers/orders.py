@@ -1,18 +1,27 @@
-import re
-from fastapi import APIRouter, Depends, HTTPException, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Request, UploadFile, File, Form
 from app.services.pricing_engine import PricingEngine
+from app.services.order_intake import SubmissionError, build_orders, submission_result, validate_submission
+from app.services.submission_queue import enqueue, queue_enabled, ticket_status, wake_submission_worker
+from app.services.idempotency import get_idempotency_store, idempotency_key
+from app.services import rollup, table_versions
+from app.services.time_parser import parse_duracion, parse_minutes
+from app.services.excel_import import UploadTooLarge, import_orders, spool_upload
+from app.services.order_reads import ORDER_COLUMNS, format_created_at, order_row_to_dict, order_rows_to_dicts
+from app.services.price_versions import explain_order
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import timezone
 import os
-from typing import Dict
-from sqlalchemy import func, desc, text
-from datetime import datetime
-
-from app.database import SessionLocal
-from app.models import Order, Service
+from zipfile import BadZipFile
+from typing import Dict, Optional
+from sqlalchemy import func, desc, or_, and_, case
+from datetime import datetime, date, timedelta
+
+from app.database import SessionLocal, ReadSessionLocal
+from app.migrations import run_migrations
+from app.models import Order, Service, OrderDailyRollup, OrderDestinoCount, FormSubmission
 from app.deps import get_current_user
 from app.schemas import User
-import unicodedata
 
 # ================================
 # API KEY para Google Forms
@@ -33,7 +42,13 @@ def get_db():
     finally:
         db.close()
 
-from datetime import datetime, timedelta
+# Solo lecturas: réplica si hay DATABASE_READ_URL, si no la principal
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 PRICE_TABLE = {
     6: 2500.00,
@@ -52,60 +67,6 @@ def assign_capacidad(pasajeros: int) -> int:
     else:
         return 45
 
-def parse_time(value: str) -> datetime:
-    """
-    Parser ultra tolerante:
-    - Soporta 12h y 24h
-    - Limpia 'a.m.', 'am', 'AM', 'p.m.', 'pm'
-    - Soporta casos inválidos como '17:33:00 am'
-      → interpreta como 24h ignorando el sufijo
-    """
-
-    if not value:
-        raise ValueError("Hora vacía")
-
-    raw = value.strip().lower()
-    raw = raw.replace("a.m.", "am").replace("p.m.", "pm").replace(".", "").strip()
-
-    # Detecta si el usuario intentó usar AM/PM
-    has_ampm = ("am" in raw) or ("pm" in raw)
-
-    # Extraemos solo los números de la hora
-    time_numbers = re.findall(r"\d+", raw)
-
-    # Si el prefijo numérico es mayor que 12, NO puede ser 12h → 24h forzado
-    try:
-        hour = int(time_numbers[0])
-        if hour > 12 and has_ampm:
-            # limpiamos am/pm y tratamos como 24h
-            raw_24 = re.sub(r"(am|pm)", "", raw).strip()
-            formats_24 = ["%H:%M:%S", "%H:%M"]
-            for fmt in formats_24:
-                try:
-                    return datetime.strptime(raw_24, fmt)
-                except:
-                    pass
-    except:
-        pass
-
-    # ------- Intento normal 12h -------
-    if has_ampm:
-        raw2 = re.sub(r"(am|pm)$", r" \1", raw.replace(" ", ""))  # agrega espacio si falta
-        for fmt in ["%I:%M:%S %p", "%I:%M %p", "%I %p"]:
-            try:
-                return datetime.strptime(raw2.upper(), fmt)
-            except:
-                pass
-
-    # ------- Intento 24h -------
-    for fmt in ["%H:%M:%S", "%H:%M"]:
-        try:
-            return datetime.strptime(raw, fmt)
-        except:
-            pass
-
-    raise ValueError(f"Formato de hora no reconocido: '{value}'")
-
 def is_cantaritos(destino: str) -> bool:
     destino = destino.lower()
     keywords = ["cantaritos", "amatitlan", "tequila"]
@@ -130,8 +91,10 @@ CANTARITOS_PRICES = {
 
 
 def determine_cantaritos_price(capacidad: int, hora_salida: str) -> float:
-    t = parse_time(hora_salida)
-    hour = t.hour
+    minutes = parse_minutes(hora_salida)
+    if minutes is None:
+        raise ValueError(f"Formato de hora no reconocido: '{hora_salida}'")
+    hour = minutes // 60
 
     # Determinar horario real
     if 9 <= hour < 12:
@@ -148,149 +111,102 @@ def determine_cantaritos_price(capacidad: int, hora_salida: str) -> float:
     return price_info["normal"]   # <<<<<<  🔥 ahora precio normal
 
 @public_router.get("/fix-db")
-def fix_db(db: Session = Depends(get_db)):
-
-    db.execute(text("""
-        ALTER TABLE orders
-        ADD COLUMN IF NOT EXISTS service_id INTEGER;
-    """))
-
-    db.execute(text("""
-        DO $$
-        BEGIN
-            IF NOT EXISTS (
-                SELECT 1
-                FROM information_schema.table_constraints
-                WHERE constraint_name = 'fk_orders_service'
-            ) THEN
-                ALTER TABLE orders
-                ADD CONSTRAINT fk_orders_service
-                FOREIGN KEY (service_id) REFERENCES services(id);
-            END IF;
-        END$$;
-    """))
-
-    db.commit()
-
-    return {"status": "ok"}
-
-
-def normalize(text: str) -> str:
-    if not text:
-        return ""
-    text = text.lower()
-    text = unicodedata.normalize("NFD", text)
-    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
-    return text
-
-
-def resolve_service_by_destino(destino: str, db: Session):
-    destino_norm = normalize(destino)
+def fix_db():
+    # Compatibilidad: ahora solo corre las migraciones pendientes
+    return {"status": "ok", "applied": run_migrations()}
 
-    services = db.query(Service).filter(Service.active == True).all()
 
-    # 1️⃣ match por slug
-    for service in services:
-        if normalize(service.slug) in destino_norm:
-            return service
+def check_form_api_key(request: Request) -> None:
+    api_key = request.headers.get("x-api-key")
+    if api_key != FORM_API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid API key")
 
-    # 2️⃣ match por nombre
-    for service in services:
-        if normalize(service.name) in destino_norm:
-            return service
 
-    # 3️⃣ fallback seguro (primer servicio activo)
-    if services:
-        return services[0]
+def _replay(response: Response, replay) -> dict:
+    status_code, body = replay
+    response.status_code = status_code
+    response.headers["Idempotent-Replay"] = "true"
+    return body
 
-    return None
 
 @public_router.post("/form-submit", include_in_schema=False)
-def form_submit(request: Request, payload: dict, db: Session = Depends(get_db)):
+def form_submit(request: Request, response: Response, payload: dict, db: Session = Depends(get_db)):
 
     # ================================
     # 🔐 API KEY
     # ================================
-    api_key = request.headers.get("x-api-key")
-    if api_key != FORM_API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API key")
+    check_form_api_key(request)
 
     # ================================
-    # 📥 Datos del Form
+    # ♻️ Idempotencia: un reintento devuelve la respuesta original
     # ================================
-    pasajeros = int(payload.get("personas", 0))
-    hora_ida = payload.get("hora_salida")
-    hora_reg = payload.get("hora_regreso")
-    destino = payload.get("destino", "")
+    store = get_idempotency_store()
+    key = idempotency_key("form-submit", request.headers.get("idempotency-key"), payload)
 
-    if pasajeros <= 0:
-        raise HTTPException(status_code=400, detail="Cantidad de pasajeros inválida")
+    replay = store.lookup(db, key)
+    if replay is not None:
+        return _replay(response, replay)
 
     # ================================
-    # 🔎 Resolver servicio automáticamente
+    # 📥 Modo cola: validar, encolar y responder 202 con ticket
     # ================================
-    service = resolve_service_by_destino(destino, db)
+    if queue_enabled():
+        try:
+            validate_submission(payload)
+        except SubmissionError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    if not service:
-        raise HTTPException(status_code=500, detail="No hay servicios configurados")
+        submission = enqueue(db, payload)
+        status_code, body = 202, {"status": "queued", "ticket": submission.id}
 
-    # ================================
-    # ⏱ Calcular duración
-    # ================================
+    else:
+        # ================================
+        # 🔎 Resolver servicio + 💰 Pricing Engine
+        # ================================
+        [item] = build_orders(db, [payload])
+        if isinstance(item, SubmissionError):
+            raise HTTPException(status_code=item.status_code, detail=item.detail)
+
+        # ================================
+        # 📝 Crear orden
+        # ================================
+        order, service_slug = item
+        order.created_at = datetime.utcnow()
+
+        db.add(order)
+        db.flush()
+        rollup.apply_delta(db, None, rollup.snapshot(order))
+        table_versions.bump(db, "orders")
+        status_code, body = 200, submission_result(order, service_slug)
+
+    # La llave va en la misma transacción que la orden / el ticket
+    store.record(db, key, status_code, body)
     try:
-        t1 = datetime.strptime(hora_ida, "%H:%M")
-        t2 = datetime.strptime(hora_reg, "%H:%M")
-        duracion = (t2 - t1).total_seconds() / 3600
-        if duracion < 0:
-            duracion += 24
-    except:
-        duracion = 0.0
-
-    # ================================
-    # 💰 Pricing Engine
-    # ================================
-    engine = PricingEngine(db)
+        db.commit()
+    except IntegrityError:
+        # Otro request con la misma llave ganó la carrera: se descarta este
+        db.rollback()
+        replay = store.lookup(db, key)
+        if replay is None:
+            raise
+        return _replay(response, replay)
 
-    subtotal, capacidad_asignada = engine.calculate(
-        service_slug=service.slug,
-        pasajeros=pasajeros,
-        duracion_horas=duracion
-    )
+    store.remember(key, status_code, body)
+    if queue_enabled():
+        wake_submission_worker()
 
-    if capacidad_asignada is None:
-        raise HTTPException(status_code=400, detail="No hay capacidades configuradas")
+    response.status_code = status_code
+    return body
 
-    # ================================
-    # 📝 Crear orden
-    # ================================
-    order = Order(
-        service_id=service.id,
-        nombre=payload.get("nombre"),
-        fecha=payload.get("fecha"),
-        dir_salida=payload.get("direccion_salida"),
-        dir_destino=destino,
-        hor_ida=hora_ida,
-        hor_regreso=hora_reg,
-        duracion=duracion,
-        capacidadu=capacidad_asignada,
-        subtotal=subtotal,
-        descuento=0.0,
-        total=subtotal,
-        abonado=0.0,
-        liquidar=subtotal
-    )
 
-    db.add(order)
-    db.commit()
-    db.refresh(order)
+@public_router.get("/form-submit/{ticket}", include_in_schema=False)
+def form_submit_status(ticket: int, request: Request, db: Session = Depends(get_db)):
+    check_form_api_key(request)
 
-    return {
-        "status": "ok",
-        "order_id": order.id,
-        "service_resolved": service.slug,
-        "capacidad_asignada": capacidad_asignada,
-        "precio_total": subtotal
-    }
+    submission = db.get(FormSubmission, ticket)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket_status(submission)
 
 
 # ================================
@@ -303,16 +219,7 @@ private_router = APIRouter(
 )
 
 def serialize_order(o: Order) -> dict:
-    if o.created_at:
-        dt = o.created_at
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        else:
-            dt = dt.astimezone(timezone.utc)
-        created_iso = dt.isoformat(timespec="seconds").replace("+00:00", "Z")
-    else:
-        created_iso = None
-
+    # Mutaciones (ya tienen la instancia ORM); las lecturas usan order_reads
     return {
         "id": o.id,
         "nombre": o.nombre,
@@ -330,21 +237,105 @@ def serialize_order(o: Order) -> dict:
         "fecha_abono": o.fecha_abono,
         "liquidar": o.liquidar,
         "texto_extra": o.texto_extra,
-        "created_at": created_iso,
+        "created_at": format_created_at(o.created_at),
     }
 
+ORDERS_PAGE_SIZE = int(os.getenv("ORDERS_PAGE_SIZE", "100"))
+ORDERS_PAGE_MAX = int(os.getenv("ORDERS_PAGE_MAX", "500"))
+
 @private_router.get("", response_model=list[dict])
 @private_router.get("/", response_model=list[dict])
-def list_orders(db: Session = Depends(get_db)):
-    orders = db.query(Order).order_by(Order.id.desc()).all()
-    return [serialize_order(o) for o in orders]
+def list_orders(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="id de la última orden recibida"),
+    limit: Optional[int] = Query(None, ge=1),
+    service_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    destino: Optional[str] = None,
+    pendiente: Optional[bool] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Paginación por keyset sobre id (más recientes primero).
+    El cursor para la siguiente página viene en el header X-Next-Cursor
+    (ausente cuando ya no hay más).
+
+    Sin cursor ni limit devuelve todas las que cumplen los filtros, como
+    antes: el dashboard filtra y ordena del lado del cliente.
+    """
+    etag, not_modified = table_versions.conditional_get(request, db, "orders")
+    if not_modified:
+        return not_modified
+
+    paginated = cursor is not None or limit is not None
+    limit = min(limit or ORDERS_PAGE_SIZE, ORDERS_PAGE_MAX)
+
+    # Solo columnas (tuplas), sin instancias ORM
+    query = db.query(*ORDER_COLUMNS)
+
+    if cursor is not None:
+        query = query.filter(Order.id < cursor)
+    if service_id is not None:
+        query = query.filter(Order.service_id == service_id)
+    if desde is not None:
+        query = query.filter(Order.created_at >= desde)
+    if hasta is not None:
+        query = query.filter(Order.created_at < hasta)
+    if destino:
+        query = query.filter(Order.dir_destino.icontains(destino, autoescape=True))
+    if pendiente is True:
+        query = query.filter(Order.liquidar > 0)
+    elif pendiente is False:
+        query = query.filter(or_(Order.liquidar <= 0, Order.liquidar.is_(None)))
+
+    query = query.order_by(Order.id.desc())
+    if paginated:
+        # Se pide una de más para saber si hay siguiente página
+        query = query.limit(limit + 1)
+    rows = query.all()
+
+    headers = table_versions.etag_headers(etag)
+    if paginated and len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1][0])
+
+    return ORJSONResponse(order_rows_to_dicts(rows), headers=headers)
+
+@private_router.post("/import")
+def import_orders_excel(
+    file: UploadFile = File(...),
+    sheet_name: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Crea una orden por cada fila del .xlsx (encabezados en la primera
+    fila: nombre, fecha, dir_salida, dir_destino, hor_ida, hor_regreso,
+    personas). Devuelve conteos + errores por fila.
+    """
+    if not (file.filename or "").lower().endswith(".xlsx"):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos .xlsx")
+
+    try:
+        spooled = spool_upload(file.file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        return import_orders(db, spooled, sheet_name)
+    except (ValueError, KeyError, BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Excel inválido: {e}")
+    finally:
+        spooled.close()
 
 @private_router.delete("/{order_id}", status_code=204)
 def delete_order(order_id: int, db: Session = Depends(get_db)):
     order = db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    rollup.apply_delta(db, rollup.snapshot(order), None)
     db.delete(order)
+    table_versions.bump(db, "orders")
     db.commit()
     return Response(status_code=204)
 
@@ -353,6 +344,7 @@ def toggle_discount(order_id: int, db: Session = Depends(get_db)):
     order = db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    before = rollup.snapshot(order)
 
     # Si descuento = 0 → aplicar descuento recomendado (10%)
     # Si descuento > 0 → quitar descuento
@@ -364,6 +356,8 @@ def toggle_discount(order_id: int, db: Session = Depends(get_db)):
     order.total = order.subtotal - order.descuento
     order.liquidar = order.total - order.abonado
 
+    rollup.apply_delta(db, before, rollup.snapshot(order))
+    table_versions.bump(db, "orders")
     db.commit()
     db.refresh(order)
     return serialize_order(order)
@@ -377,9 +371,12 @@ def add_payment(order_id: int, amount: float, db: Session = Depends(get_db)):
     if amount <= 0:
         raise HTTPException(status_code=400, detail="El abono debe ser mayor a 0")
 
+    before = rollup.snapshot(order)
     order.abonado += amount
     order.liquidar = order.total - order.abonado
 
+    rollup.apply_delta(db, before, rollup.snapshot(order))
+    table_versions.bump(db, "orders")
     db.commit()
     db.refresh(order)
     return serialize_order(order)
@@ -390,9 +387,12 @@ def reset_payment(order_id: int, db: Session = Depends(get_db)):
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    before = rollup.snapshot(order)
     order.abonado = 0
     order.liquidar = order.total
 
+    rollup.apply_delta(db, before, rollup.snapshot(order))
+    table_versions.bump(db, "orders")
     db.commit()
     db.refresh(order)
     return serialize_order(order)
@@ -404,6 +404,8 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    before = rollup.snapshot(order)
+
     # ================================
     # Actualizar campos básicos
     # ================================
@@ -417,16 +419,9 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
     # ================================
     # Recalcular duración (si cambian horas)
     # ================================
-    try:
-        if order.hor_ida and order.hor_regreso:
-            t1 = parse_time(order.hor_ida)
-            t2 = parse_time(order.hor_regreso)
-            duracion = (t2 - t1).total_seconds() / 3600
-            if duracion < 0:
-                duracion += 24
-            order.duracion = duracion
-    except:
-        pass
+    duracion = parse_duracion(order.hor_ida, order.hor_regreso)
+    if duracion is not None:
+        order.duracion = duracion
 
     # ================================
     # Capacidad (editable también)
@@ -441,6 +436,7 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
     # ================================
     if "subtotal" in payload:
         order.subtotal = float(payload["subtotal"])
+        order.price_version_id = None  # precio manual
     else:
         engine = PricingEngine(db)
         service = db.get(Service, order.service_id)
@@ -449,12 +445,14 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
             subtotal, capacidad_asignada = engine.calculate(
                 service_slug=service.slug,
                 pasajeros=order.capacidadu,
-                hora=order.hor_ida
+                duracion_horas=order.duracion or 0.0
             )
             order.capacidadu = capacidad_asignada
             order.subtotal = subtotal
+            order.price_version_id = engine.price_version_id
         else:
             order.subtotal = 0
+            order.price_version_id = None
 
     # ================================
     # Descuento editable
@@ -474,6 +472,8 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
     order.total = (order.subtotal or 0) - (order.descuento or 0)
     order.liquidar = order.total - (order.abonado or 0)
 
+    rollup.apply_delta(db, before, rollup.snapshot(order))
+    table_versions.bump(db, "orders")
     db.commit()
     db.refresh(order)
 
@@ -481,19 +481,53 @@ def update_order(order_id: int, payload: dict, db: Session = Depends(get_db)):
 
 
 @private_router.get("/stats")
-def get_orders_stats(db: Session = Depends(get_db)):
+def get_orders_stats(db: Session = Depends(get_read_db)):
 
     # ================================
-    # 📦 Totales generales
+    # 📅 Mes actual (rango de días en el rollup)
     # ================================
 
-    total_orders = db.query(func.count(Order.id)).scalar() or 0
-
-    total_facturado = db.query(func.sum(Order.total)).scalar() or 0
-    total_abonado = db.query(func.sum(Order.abonado)).scalar() or 0
-    total_pendiente = db.query(func.sum(Order.liquidar)).scalar() or 0
-    ingresos_brutos = db.query(func.sum(Order.subtotal)).scalar() or 0
-    total_descuentos = db.query(func.sum(Order.descuento)).scalar() or 0
+    now = datetime.utcnow()
+    month_start = date(now.year, now.month, 1)
+    next_month = (
+        date(now.year + 1, 1, 1) if now.month == 12
+        else date(now.year, now.month + 1, 1)
+    )
+    in_month = and_(OrderDailyRollup.day >= month_start, OrderDailyRollup.day < next_month)
+
+    # ================================
+    # 📦 Totales generales + mes actual desde order_daily_rollup
+    # (el costo crece con los días, no con las órdenes)
+    # ================================
+
+    (
+        total_orders,
+        total_facturado,
+        total_abonado,
+        total_pendiente,
+        ingresos_brutos,
+        total_descuentos,
+        ordenes_mes_actual,
+        ingresos_mes_actual,
+    ) = db.query(
+        func.sum(OrderDailyRollup.orders),
+        func.sum(OrderDailyRollup.total),
+        func.sum(OrderDailyRollup.abonado),
+        func.sum(OrderDailyRollup.liquidar),
+        func.sum(OrderDailyRollup.subtotal),
+        func.sum(OrderDailyRollup.descuento),
+        func.sum(case((in_month, OrderDailyRollup.orders))),
+        func.sum(case((in_month, OrderDailyRollup.total))),
+    ).one()
+
+    total_orders = int(total_orders or 0)
+    total_facturado = total_facturado or 0
+    total_abonado = total_abonado or 0
+    total_pendiente = total_pendiente or 0
+    ingresos_brutos = ingresos_brutos or 0
+    total_descuentos = total_descuentos or 0
+    ordenes_mes_actual = int(ordenes_mes_actual or 0)
+    ingresos_mes_actual = ingresos_mes_actual or 0
 
     ticket_promedio = (
         total_facturado / total_orders
@@ -509,54 +543,32 @@ def get_orders_stats(db: Session = Depends(get_db)):
     # 🚐 Capacidad más solicitada
     # ================================
 
+    count = func.sum(OrderDailyRollup.orders).label("count")
     capacidad_top = (
-        db.query(Order.capacidadu, func.count(Order.id).label("count"))
-        .group_by(Order.capacidadu)
+        db.query(OrderDailyRollup.capacidad, count)
+        .group_by(OrderDailyRollup.capacidad)
+        .having(count > 0)
         .order_by(desc("count"))
         .first()
     )
 
-    capacidad_mas_solicitada = capacidad_top[0] if capacidad_top else None
+    # capacidad 0 en el rollup = orden sin capacidad
+    capacidad_mas_solicitada = (capacidad_top[0] or None) if capacidad_top else None
 
     # ================================
     # 📍 Destino más frecuente
+    # (contador por destino, mantenido junto con el rollup)
     # ================================
 
     destino_top = (
-        db.query(Order.dir_destino, func.count(Order.id).label("count"))
-        .group_by(Order.dir_destino)
-        .order_by(desc("count"))
+        db.query(OrderDestinoCount.destino)
+        .filter(OrderDestinoCount.orders > 0)
+        .order_by(OrderDestinoCount.orders.desc())
         .first()
     )
 
     destino_mas_frecuente = destino_top[0] if destino_top else None
 
-    # ================================
-    # 📅 Mes actual
-    # ================================
-
-    now = datetime.utcnow()
-
-    ordenes_mes_actual = (
-        db.query(func.count(Order.id))
-        .filter(
-            func.extract("month", Order.created_at) == now.month,
-            func.extract("year", Order.created_at) == now.year
-        )
-        .scalar()
-        or 0
-    )
-
-    ingresos_mes_actual = (
-        db.query(func.sum(Order.total))
-        .filter(
-            func.extract("month", Order.created_at) == now.month,
-            func.extract("year", Order.created_at) == now.year
-        )
-        .scalar()
-        or 0
-    )
-
     # ================================
     # 🎯 Response
     # ================================
@@ -582,6 +594,53 @@ def get_orders_stats(db: Session = Depends(get_db)):
         }
     }
 
+@private_router.get("/stats/daily")
+def get_orders_stats_daily(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    service_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Serie diaria (desde el rollup). `hasta` es exclusivo.
+    """
+    query = db.query(
+        OrderDailyRollup.day,
+        func.sum(OrderDailyRollup.orders),
+        func.sum(OrderDailyRollup.subtotal),
+        func.sum(OrderDailyRollup.descuento),
+        func.sum(OrderDailyRollup.total),
+        func.sum(OrderDailyRollup.abonado),
+        func.sum(OrderDailyRollup.liquidar),
+    )
+
+    if desde is not None:
+        query = query.filter(OrderDailyRollup.day >= desde)
+    if hasta is not None:
+        query = query.filter(OrderDailyRollup.day < hasta)
+    if service_id is not None:
+        query = query.filter(OrderDailyRollup.service_id == service_id)
+
+    rows = (
+        query.group_by(OrderDailyRollup.day)
+        .having(func.sum(OrderDailyRollup.orders) > 0)
+        .order_by(OrderDailyRollup.day)
+        .all()
+    )
+
+    return [
+        {
+            "dia": day.isoformat(),
+            "ordenes": int(orders),
+            "subtotal": round(subtotal or 0, 2),
+            "descuento": round(descuento or 0, 2),
+            "total": round(total or 0, 2),
+            "abonado": round(abonado or 0, 2),
+            "liquidar": round(liquidar or 0, 2),
+        }
+        for day, orders, subtotal, descuento, total, abonado, liquidar in rows
+    ]
+
 @private_router.put("/{order_id}/extra-text")
 def update_extra_text(
     order_id: int,
@@ -595,6 +654,7 @@ def update_extra_text(
         raise HTTPException(status_code=404, detail="Order not found")
 
     order.texto_extra = payload.get("texto_extra", "").strip()
+    table_versions.bump(db, "orders")
     db.commit()
     db.refresh(order)
 
@@ -607,7 +667,7 @@ def update_extra_text(
 @private_router.get("/{order_id}/extra-text")
 def get_extra_text(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     order = db.get(Order, order_id)
@@ -632,6 +692,7 @@ def delete_extra_text(
         raise HTTPException(status_code=404, detail="Order not found")
 
     order.texto_extra = None
+    table_versions.bump(db, "orders")
     db.commit()
 
     return {
@@ -640,8 +701,17 @@ def delete_extra_text(
     }
 
 @private_router.get("/{order_id}", response_model=dict)
-def get_order(order_id: int, db: Session = Depends(get_db)):
+def get_order(order_id: int, db: Session = Depends(get_read_db)):
+    row = db.query(*ORDER_COLUMNS).filter(Order.id == order_id).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return ORJSONResponse(order_row_to_dict(row))
+
+
+@private_router.get("/{order_id}/pricing", response_model=dict)
+def get_order_pricing(order_id: int, db: Session = Depends(get_read_db)):
+    """Versión de tarifas con la que se cotizó la orden y el recálculo con ella."""
     order = db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return serialize_order(order)
\ No newline at end of file
+    return explain_order(db, order)
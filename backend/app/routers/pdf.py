@@ -1,23 +1,30 @@
 # app/routers/pdf.py
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from io import BytesIO
 import os
-import subprocess
 import re
-from typing import Any, Dict
-from docxcompose.composer import Composer
+import json
+import time
+from functools import partial
+from typing import Any, Dict, Optional
+from concurrent.futures import wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from zipfile import ZipFile, ZIP_STORED, BadZipFile
 from app.database import SessionLocal
 from app.models import Order
 from app.pdf_utils import docx_to_pdf_bytes
+from app.main_utils import build_mapping_from_row
+from app.services.excel_import import UploadTooLarge, iter_sheet_rows, spool_upload
+from app.services.converter_pool import get_converter_pool
+from app.services.document_cache import get_document_cache, document_key
+from app.services.render_executor import BulkLane, get_render_executor, RenderBusy
 from app.deps import get_current_user   # rutas protegidas
 from app.schemas import User            # (payload del usuario autenticado)
-from docx import Document
-from io import BytesIO
-from app.pdf_utils import fill_docx_with_mapping
+from app.pdf_utils import get_compiled_template
 from app.pdf_utils import TEMPLATE_PATH
-from docx.enum.section import WD_SECTION
 
 router = APIRouter(prefix="/pdf", tags=["PDF"])
 
@@ -68,6 +75,110 @@ def generate_pdf_from_order(mapping: dict, texto_extra: str | None) -> bytes:
     # 3️⃣ Convertir resultado final a PDF
     return docx_to_pdf_bytes(final_docx)
 
+def _template_version(texto_extra: str | None) -> str:
+    version = get_compiled_template(TEMPLATE_PATH).version
+    if texto_extra and texto_extra.strip() and os.path.exists(EXTRA_TEMPLATE_PATH):
+        st = os.stat(EXTRA_TEMPLATE_PATH)
+        version += f"+{st.st_mtime_ns:x}-{st.st_size:x}"
+    return version
+
+def render_cached(fmt: str, mapping: dict, texto_extra: str | None, render) -> bytes:
+    """
+    Sirve el documento desde el cache si (plantilla, mapping, texto_extra,
+    formato) no cambió; si no, lo genera y lo guarda.
+    """
+    cache = get_document_cache()
+    if cache is None:
+        return render()
+    key = document_key(fmt, mapping, texto_extra, _template_version(texto_extra))
+    return cache.get_or_render(key, render)
+
+async def render_cached_async(fmt: str, mapping: dict, texto_extra: str | None, render) -> bytes:
+    """
+    Igual que render_cached, pero el render bloqueante corre en el executor
+    de PDFs (el event loop queda libre). Un hit de cache no ocupa cola.
+    Cola llena => 503 con Retry-After.
+    """
+    cache = get_document_cache()
+    key = None
+    if cache is not None:
+        key = document_key(fmt, mapping, texto_extra, _template_version(texto_extra))
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+    def job() -> bytes:
+        data = render()
+        if cache is not None:
+            cache.put(key, data)
+        return data
+
+    try:
+        return await get_render_executor().run(job)
+    except RenderBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+@router.get("/pool")
+def converter_pool_health(current_user: User = Depends(get_current_user)):
+    # Estado de los workers de LibreOffice (health check / reinicios)
+    return get_converter_pool().health()
+
+@router.get("/cache")
+def document_cache_stats(current_user: User = Depends(get_current_user)):
+    # Hits / misses del cache de documentos generados
+    cache = get_document_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@router.get("/render-queue")
+def render_queue_stats(current_user: User = Depends(get_current_user)):
+    # Concurrencia / cola / rechazos del executor de PDFs
+    return get_render_executor().stats()
+
+def _g(d: Dict[str, Any], k: str) -> str:
+    for cand in (k, k.lower(), k.upper()):
+        if cand in d:
+            v = d[cand]
+            return "" if v is None else str(v)
+    return ""
+
+def build_pdf_mapping(data: Dict[str, Any]) -> tuple[dict, str]:
+    """
+    Mapping de la plantilla + texto_extra para el PDF de una orden
+    (mismo formato para /from-data y /bulk).
+    """
+    # 🔹 Números
+    subtotal  = parse_num(_g(data, "subtotal"))
+    descuento = parse_num(_g(data, "descuento"))
+    abonado   = parse_num(_g(data, "abonado"))
+
+    total     = subtotal - descuento
+    liquidar  = total - abonado
+
+    # 🔹 Texto extra (🔥 aquí está la diferencia)
+    texto_extra = _g(data, "texto_extra")
+
+    mapping = {
+        "&NOMBRE&": _g(data, "nombre"),
+        "&FECHA&": _g(data, "fecha"),
+        "&DIR_SALIDA&": _g(data, "dir_salida"),
+        "&DIR_DESTINO&": _g(data, "dir_destino"),
+        "&HOR_IDA&": _g(data, "hor_ida"),
+        "&HOR_REGRESO&": _g(data, "hor_regreso"),
+        "&DURACION&": _g(data, "duracion"),
+        "&CAPACIDADU&": _g(data, "capacidadu"),
+        "&SUBTOTAL&": f"{subtotal:,.2f}",
+        "&DESCUENTO&": f"{descuento:,.2f}",
+        "&TOTAL&": f"{total:,.2f}",
+        "&ABONADO&": f"{abonado:,.2f}",
+        "&FECHA_ABONO&": _g(data, "fecha_abono"),
+        "&LIQUIDAR&": f"{liquidar:,.2f}",
+    }
+    return mapping, texto_extra
+
 # ─────────────────────────────────────────────────────────────────────────────
 # POST /pdf/from-data  → Genera PDF desde JSON (NO guarda en DB)
 # Si te pasan subtotal/desc/abonado, recalculamos total y liquidar.
@@ -80,93 +191,43 @@ async def pdf_from_data(
     current_user: User = Depends(get_current_user),
 ):
     try:
-        def g(d: Dict[str, Any], k: str) -> str:
-            for cand in (k, k.lower(), k.upper()):
-                if cand in d:
-                    v = d[cand]
-                    return "" if v is None else str(v)
-            return ""
-
-        # 🔹 Números
-        subtotal  = parse_num(g(data, "subtotal"))
-        descuento = parse_num(g(data, "descuento"))
-        abonado   = parse_num(g(data, "abonado"))
-
-        total     = subtotal - descuento
-        liquidar  = total - abonado
-
-        # 🔹 Texto extra (🔥 aquí está la diferencia)
-        texto_extra = g(data, "texto_extra")
-
-        mapping = {
-            "&NOMBRE&": g(data, "nombre"),
-            "&FECHA&": g(data, "fecha"),
-            "&DIR_SALIDA&": g(data, "dir_salida"),
-            "&DIR_DESTINO&": g(data, "dir_destino"),
-            "&HOR_IDA&": g(data, "hor_ida"),
-            "&HOR_REGRESO&": g(data, "hor_regreso"),
-            "&DURACION&": g(data, "duracion"),
-            "&CAPACIDADU&": g(data, "capacidadu"),
-            "&SUBTOTAL&": f"{subtotal:,.2f}",
-            "&DESCUENTO&": f"{descuento:,.2f}",
-            "&TOTAL&": f"{total:,.2f}",
-            "&ABONADO&": f"{abonado:,.2f}",
-            "&FECHA_ABONO&": g(data, "fecha_abono"),
-            "&LIQUIDAR&": f"{liquidar:,.2f}",
-        }
+        mapping, texto_extra = build_pdf_mapping(data)
 
         # 🔥 USAMOS LA FUNCIÓN QUE HACE MERGE
-        pdf_bytes = generate_pdf_from_order(
-            mapping=mapping,
-            texto_extra=texto_extra
+        pdf_bytes = await render_cached_async(
+            "pdf",
+            mapping,
+            texto_extra,
+            lambda: generate_pdf_from_order(mapping=mapping, texto_extra=texto_extra),
         )
 
-        return StreamingResponse(
-            BytesIO(pdf_bytes),
+        # Bytes ya en memoria: Response directo (StreamingResponse sobre
+        # BytesIO itera por líneas y trocea el binario en miles de chunks)
+        return Response(
+            content=pdf_bytes,
             media_type="application/pdf",
             headers={"Content-Disposition": 'attachment; filename="orden.pdf"'},
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
-def _replace_tokens_in_paragraph(paragraph, mapping: dict) -> None:
-    # Une runs -> reemplaza sobre el texto completo -> reescribe
-    full = "".join(run.text for run in paragraph.runs)
-    if not full:
-        return
-
-    changed = False
-    for key, value in mapping.items():
-        if key in full:
-            full = full.replace(key, value)
-            changed = True
-
-    if not changed:
-        return
-
-    # Limpia todos los runs y deja el texto en el primero
-    for run in paragraph.runs:
-        run.text = ""
-    paragraph.runs[0].text = full
-
-
 def generate_docx_from_template(mapping: dict) -> bytes:
-    if not os.path.exists(TEMPLATE_PATH):
-        raise FileNotFoundError("No se encontró la plantilla")
-
-    with open(TEMPLATE_PATH, "rb") as f:
-        tpl_bytes = f.read()
-
-    return fill_docx_with_mapping(tpl_bytes, mapping)
+    # Plantilla precompilada (se recarga sola si cambia el archivo)
+    return get_compiled_template(TEMPLATE_PATH).fill(mapping)
 
 EXTRA_TEMPLATE_PATH = os.path.join(
     os.path.dirname(__file__),
     "../../PlantillaExtra.docx"
 )
 
+# python-docx / docxcompose solo se cargan si se usa el texto extra
 def generate_extra_page(texto: str) -> bytes:
+    from docx import Document
+
     doc = Document(EXTRA_TEMPLATE_PATH)
 
     # 🔥 FORZAR NUEVA PÁGINA AL INICIO
@@ -182,6 +243,10 @@ def generate_extra_page(texto: str) -> bytes:
     return buffer.read()
 
 def merge_docx(base_bytes: bytes, extra_bytes: bytes) -> bytes:
+    from docx import Document
+    from docx.enum.section import WD_SECTION
+    from docxcompose.composer import Composer
+
     base_doc = Document(BytesIO(base_bytes))
 
     # 🔥 FORZAR NUEVA SECCIÓN EN NUEVA PÁGINA
@@ -204,17 +269,10 @@ async def word_from_data(
     current_user: User = Depends(get_current_user),
 ):
     try:
-        def g(d: Dict[str, Any], k: str) -> str:
-            for cand in (k, k.lower(), k.upper()):
-                if cand in d:
-                    v = d[cand]
-                    return "" if v is None else str(v)
-            return ""
-
         # ========= Leer valores =========
-        s_subtotal  = g(data, "subtotal")
-        s_descuento = g(data, "descuento")
-        s_abonado   = g(data, "abonado")
+        s_subtotal  = _g(data, "subtotal")
+        s_descuento = _g(data, "descuento")
+        s_abonado   = _g(data, "abonado")
 
         subtotal  = parse_num(s_subtotal)
         descuento = parse_num(s_descuento)
@@ -224,31 +282,440 @@ async def word_from_data(
         liquidar = total - abonado
 
         mapping = {
-            "&NOMBRE&": g(data, "nombre"),
-            "&FECHA&": g(data, "fecha"),
-            "&DIR_SALIDA&": g(data, "dir_salida"),
-            "&DIR_DESTINO&": g(data, "dir_destino"),
-            "&HOR_IDA&": g(data, "hor_ida"),
-            "&HOR_REGRESO&": g(data, "hor_regreso"),
-            "&DURACION&": g(data, "duracion"),
-            "&CAPACIDADU&": g(data, "capacidadu"),
+            "&NOMBRE&": _g(data, "nombre"),
+            "&FECHA&": _g(data, "fecha"),
+            "&DIR_SALIDA&": _g(data, "dir_salida"),
+            "&DIR_DESTINO&": _g(data, "dir_destino"),
+            "&HOR_IDA&": _g(data, "hor_ida"),
+            "&HOR_REGRESO&": _g(data, "hor_regreso"),
+            "&DURACION&": _g(data, "duracion"),
+            "&CAPACIDADU&": _g(data, "capacidadu"),
             "&SUBTOTAL&": f"{subtotal:.2f}",
             "&DESCUENTO&": f"{descuento:.2f}",
             "&TOTAL&": f"{total:.2f}",
             "&ABONADO&": f"{abonado:.2f}",
-            "&FECHA_ABONO&": g(data, "fecha_abono"),
+            "&FECHA_ABONO&": _g(data, "fecha_abono"),
             "&LIQUIDAR&": f"{liquidar:.2f}",
         }
 
-        docx_bytes = generate_docx_from_template(mapping)
+        docx_bytes = await render_cached_async(
+            "docx",
+            mapping,
+            None,
+            lambda: generate_docx_from_template(mapping),
+        )
 
-        return StreamingResponse(
-            BytesIO(docx_bytes),
+        return Response(
+            content=docx_bytes,
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             headers={
                 "Content-Disposition": 'attachment; filename="orden.docx"'
             },
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# POST /pdf/bulk  → ZIP con los PDFs de varias órdenes (streaming)
+# ─────────────────────────────────────────────────────────────────────────────
+BULK_PDF_MAX_ORDERS = int(os.getenv("BULK_PDF_MAX_ORDERS", "5000"))
+BULK_PDF_CHUNK = 100
+
+ORDER_PDF_COLUMNS = (
+    Order.id, Order.nombre, Order.fecha, Order.dir_salida, Order.dir_destino,
+    Order.hor_ida, Order.hor_regreso, Order.duracion, Order.capacidadu,
+    Order.subtotal, Order.descuento, Order.abonado, Order.fecha_abono,
+    Order.texto_extra,
+)
+
+
+class _ZipSink:
+    """Destino no-seekable para ZipFile: acumula bytes hasta drenarlos."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parse_date(value: Any, field: str) -> datetime:
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{field}' debe ser fecha ISO (YYYY-MM-DD)")
+
+
+def _bulk_order_ids(payload: Dict[str, Any], db: Session) -> list[int]:
+    query = db.query(Order.id)
+
+    if payload.get("order_ids") is not None:
+        ids = payload["order_ids"]
+        if not isinstance(ids, list):
+            raise HTTPException(status_code=400, detail="'order_ids' debe ser una lista")
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="'order_ids' debe contener enteros")
+        query = query.filter(Order.id.in_(ids))
+    elif payload.get("desde") or payload.get("hasta"):
+        if payload.get("desde"):
+            query = query.filter(Order.created_at >= _parse_date(payload["desde"], "desde"))
+        if payload.get("hasta"):
+            # 'hasta' inclusivo si viene como fecha sin hora
+            hasta = _parse_date(payload["hasta"], "hasta")
+            if len(str(payload["hasta"])) <= 10:
+                hasta += timedelta(days=1)
+            query = query.filter(Order.created_at < hasta)
+    else:
+        raise HTTPException(status_code=400, detail="Envía 'order_ids' o un rango 'desde'/'hasta'")
+
+    if payload.get("service_id") is not None:
+        query = query.filter(Order.service_id == payload["service_id"])
+
+    ids = [row[0] for row in query.order_by(Order.id.asc()).limit(BULK_PDF_MAX_ORDERS + 1)]
+    if len(ids) > BULK_PDF_MAX_ORDERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {BULK_PDF_MAX_ORDERS} órdenes por ZIP"
+        )
+    return ids
+
+
+def _iter_order_mappings(order_ids: list[int]):
+    # Sesión propia: el generador corre después de cerrar la del request
+    db = SessionLocal()
+    try:
+        keys = [c.key for c in ORDER_PDF_COLUMNS]
+        for i in range(0, len(order_ids), BULK_PDF_CHUNK):
+            chunk = order_ids[i:i + BULK_PDF_CHUNK]
+            rows = (
+                db.query(*ORDER_PDF_COLUMNS)
+                .filter(Order.id.in_(chunk))
+                .order_by(Order.id.asc())
+                .all()
+            )
+            for row in rows:
+                data = dict(zip(keys, row))
+                mapping, texto_extra = build_pdf_mapping(data)
+                yield data["id"], mapping, texto_extra
+    finally:
+        db.close()
+
+
+def _render_order_pdf(mapping: dict, texto_extra: str) -> tuple[bytes, dict]:
+    pdf = render_cached(
+        "pdf",
+        mapping,
+        texto_extra,
+        lambda: generate_pdf_from_order(mapping=mapping, texto_extra=texto_extra),
+    )
+    return pdf, {}
+
+
+def open_bulk_lane() -> BulkLane:
+    """Carril masivo del executor de PDFs; si ya hay exportaciones en curso => 503."""
+    try:
+        return get_render_executor().open_bulk()
+    except RenderBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def render_bounded(jobs, lane: BulkLane):
+    """
+    Corre los render() en paralelo en el carril masivo (deja workers de
+    LibreOffice libres para lo interactivo), como mucho 2 × lane.concurrency
+    documentos en vuelo (la memoria no crece con el lote).
+
+    jobs: iterable de (archivo, etiqueta, render) con render() -> (bytes, info).
+    Entrega (archivo, etiqueta, elapsed_ms, data, info, error) conforme terminan.
+    """
+    workers = lane.concurrency
+    pending = {}   # future -> (archivo, etiqueta, encolado)
+    jobs = iter(jobs)
+    exhausted = False
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                try:
+                    filename, label, render = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = lane.submit(render)
+                pending[future] = (filename, label, time.perf_counter())
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                filename, label, queued = pending.pop(future)
+                elapsed_ms = round((time.perf_counter() - queued) * 1000, 1)
+                try:
+                    data, info = future.result()
+                except Exception as e:
+                    yield filename, label, elapsed_ms, None, None, e
+                else:
+                    yield filename, label, elapsed_ms, data, info, None
+    finally:
+        # Cliente desconectado: lo que no empezó no ocupa el carril
+        for future in pending:
+            future.cancel()
+
+
+def stream_pdf_zip(jobs, lane: BulkLane, manifest: bool = False):
+    """
+    Genera el ZIP conforme terminan las conversiones (ver render_bounded).
+    Con manifest=True agrega manifest.json con el info + tiempos de cada archivo.
+    Al terminar (o si el cliente se va) libera el carril.
+    """
+    try:
+        yield from _stream_pdf_zip(jobs, lane, manifest)
+    finally:
+        lane.close()
+
+
+def _stream_pdf_zip(jobs, lane: BulkLane, manifest: bool):
+    workers = lane.concurrency
+    sink = _ZipSink()
+    errors = []
+    entries = []
+    started = time.perf_counter()
+
+    with ZipFile(sink, "w", compression=ZIP_STORED) as zf:
+        for filename, label, elapsed_ms, data, info, error in render_bounded(jobs, lane):
+            if error is None:
+                zf.writestr(filename, data)
+                entries.append({"file": filename, **info, "elapsed_ms": elapsed_ms})
+            else:
+                errors.append(f"{label}: {error}")
+                entries.append({"file": filename, "error": str(error), "elapsed_ms": elapsed_ms})
+            yield sink.drain()
+
+        if errors:
+            zf.writestr("errores.txt", "\n".join(errors) + "\n")
+
+        if manifest:
+            zf.writestr("manifest.json", json.dumps({
+                "files": len(entries) - len(errors),
+                "errors": len(errors),
+                "workers": workers,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "items": entries,
+            }, ensure_ascii=False, indent=2))
+
+    yield sink.drain()
+
+
+def stream_orders_zip(order_ids: list[int], lane: BulkLane):
+    jobs = (
+        (f"orden_{order_id}.pdf", f"orden {order_id}", partial(_render_order_pdf, mapping, texto_extra))
+        for order_id, mapping, texto_extra in _iter_order_mappings(order_ids)
+    )
+    return stream_pdf_zip(jobs, lane)
+
+
+@router.post("/bulk")
+def pdf_bulk(
+    payload: Dict[str, Any],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Body: {"order_ids": [1, 2, ...]}  o  {"desde": "2026-01-01", "hasta": "2026-01-31"}
+          (+ opcional "service_id")
+    """
+    order_ids = _bulk_order_ids(payload, db)
+    if not order_ids:
+        raise HTTPException(status_code=404, detail="No hay órdenes para exportar")
+
+    lane = open_bulk_lane()
+    return StreamingResponse(
+        stream_orders_zip(order_ids, lane),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="ordenes.zip"'},
+        # Por si el stream nunca llega a arrancar
+        background=BackgroundTask(lane.close),
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# POST /pdf/from-excel-batch  → Un PDF por fila del Excel (ZIP o PDF unido)
+# ─────────────────────────────────────────────────────────────────────────────
+EXCEL_PDF_MAX_ROWS = int(os.getenv("EXCEL_PDF_MAX_ROWS", "1000"))
+
+
+def _render_row_pdf(row_number: int, mapping: dict) -> tuple[bytes, dict]:
+    info = {"row": row_number}
+
+    cache = get_document_cache()
+    key = None
+    if cache is not None:
+        key = document_key("pdf", mapping, None, _template_version(None))
+        data = cache.get(key)
+        if data is not None:
+            info["cached"] = True
+            return data, info
+
+    t0 = time.perf_counter()
+    docx_bytes = generate_docx_from_template(mapping)
+    t1 = time.perf_counter()
+    pdf_bytes = docx_to_pdf_bytes(docx_bytes)
+    t2 = time.perf_counter()
+
+    if cache is not None:
+        cache.put(key, pdf_bytes)
+
+    info["fill_ms"] = round((t1 - t0) * 1000, 1)
+    info["convert_ms"] = round((t2 - t1) * 1000, 1)
+    return pdf_bytes, info
+
+
+class MergedRenderError(Exception):
+    def __init__(self, errors: list[str]):
+        super().__init__(f"{len(errors)} fila(s) no se pudieron generar")
+        self.errors = errors
+
+
+def render_merged_pdf(rows: list[tuple[int, dict]], lane: BulkLane) -> tuple[bytes, dict]:
+    """
+    Un PDF por fila en paralelo en el carril masivo (igual que el ZIP, cada
+    conversión con su propio PDF_JOB_TIMEOUT) y después se unen en orden
+    de fila. El manifest con tiempos por fila va adjunto al PDF.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    workers = lane.concurrency
+    started = time.perf_counter()
+
+    jobs = (
+        (f"fila_{row_number}.pdf", f"fila {row_number}", partial(_render_row_pdf, row_number, mapping))
+        for row_number, mapping in rows
+    )
+    pdfs = {}
+    entries = []
+    errors = []
+    for filename, label, elapsed_ms, data, info, error in render_bounded(jobs, lane):
+        if error is None:
+            pdfs[filename] = data
+            entries.append({"file": filename, **info, "elapsed_ms": elapsed_ms})
+        else:
+            errors.append(f"{label}: {error}")
+
+    # Un PDF unido con huecos confunde más que un error
+    if errors:
+        raise MergedRenderError(errors)
+
+    t_merge = time.perf_counter()
+    writer = PdfWriter()
+    for row_number, _ in rows:
+        writer.append(PdfReader(BytesIO(pdfs.pop(f"fila_{row_number}.pdf"))))
+    entries.sort(key=lambda e: e["row"])
+
+    manifest = {
+        "rows": len(rows),
+        "workers": workers,
+        "fill_ms": round(sum(e.get("fill_ms", 0) for e in entries), 1),
+        "convert_ms": round(sum(e.get("convert_ms", 0) for e in entries), 1),
+        "merge_ms": round((time.perf_counter() - t_merge) * 1000, 1),
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "items": entries,
+    }
+    writer.add_attachment("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue(), manifest
+
+
+@router.post("/from-excel-batch")
+def pdf_from_excel_batch(
+    file: UploadFile = File(...),
+    sheet_name: Optional[str] = Form(None),
+    formato: str = Form("zip"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    formato=zip    → ZIP con fila_<n>.pdf + manifest.json (tiempos por fila)
+    formato=merged → un solo PDF (filas convertidas en paralelo y unidas);
+                     totales en headers X-Render-*, tiempos por fila en el
+                     manifest.json adjunto al PDF
+    """
+    if formato not in ("zip", "merged"):
+        raise HTTPException(status_code=400, detail="formato debe ser 'zip' o 'merged'")
+    if not (file.filename or "").lower().endswith(".xlsx"):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos .xlsx")
+
+    # Las filas se leen completas antes de responder (así un Excel
+    # inválido es 400 y no un ZIP cortado); solo se guardan los mappings
+    try:
+        spooled = spool_upload(file.file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    rows = []
+    try:
+        for row_number, row in iter_sheet_rows(spooled, sheet_name):
+            if len(rows) >= EXCEL_PDF_MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"Máximo {EXCEL_PDF_MAX_ROWS} filas por Excel")
+            rows.append((row_number, build_mapping_from_row(row)))
+    except (ValueError, KeyError, BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Excel inválido: {e}")
+    finally:
+        spooled.close()
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="El Excel no tiene filas.")
+
+    lane = open_bulk_lane()
+    if formato == "merged":
+        try:
+            pdf_bytes, timings = render_merged_pdf(rows, lane)
+        except MergedRenderError as e:
+            raise HTTPException(status_code=500, detail={"message": str(e), "errors": e.errors[:50]})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            lane.close()
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": 'attachment; filename="ordenes.pdf"',
+                "X-Render-Rows": str(timings["rows"]),
+                "X-Render-Workers": str(timings["workers"]),
+                "X-Render-Fill-Ms": str(timings["fill_ms"]),
+                "X-Render-Convert-Ms": str(timings["convert_ms"]),
+                "X-Render-Merge-Ms": str(timings["merge_ms"]),
+                "X-Render-Total-Ms": str(timings["total_ms"]),
+            },
+        )
+
+    jobs = (
+        (f"fila_{row_number}.pdf", f"fila {row_number}", partial(_render_row_pdf, row_number, mapping))
+        for row_number, mapping in rows
+    )
+    return StreamingResponse(
+        stream_pdf_zip(jobs, lane, manifest=True),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="ordenes_excel.zip"'},
+        background=BackgroundTask(lane.close),
+    )
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from zipfile import BadZipFile
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models import ServicePrice, Service
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal
 from app.deps import get_current_user
 from seed import run as run_seed
-from app.services.service_resolver import resolve_service
+from app.services.service_resolver import refresh_service_index, invalidate_service_index
+from app.services.price_matrix import refresh_price_matrix, invalidate_price_matrix
+from app.services import table_versions
+from app.services.excel_import import UploadTooLarge, spool_upload
+from app.services.price_bulk import PriceSheetError, apply_price_sheet, rows_from_csv, rows_from_json, rows_from_xlsx
+from app.services.price_versions import (
+    PriceVersionError, delete_price_version, get_price_version, list_price_versions, publish_changes,
+    publish_price_version,
+)
 
 
 seed_router = APIRouter(
@@ -14,8 +27,15 @@ seed_router = APIRouter(
 
 @seed_router.post("/prices")
 def seed_prices():
-    run_seed()
-    return {"status": "seed executed"}
+    result = run_seed()
+    invalidate_price_matrix()
+    invalidate_service_index()
+    return {
+        "status": "seed executed",
+        "services_created": result["services_created"],
+        "inserted": result["inserted"],
+        "price_version": result.get("price_version"),
+    }
 
 price_router = APIRouter(
     prefix="/service-prices",
@@ -30,6 +50,24 @@ def get_db():
     finally:
         db.close()
 
+# Solo lecturas: réplica si hay DATABASE_READ_URL, si no la principal
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _auto_publish(db: Session, label: str, keys: list, response: Optional[Response] = None) -> Optional[dict]:
+    # Con versionado activo solo las filas editadas pasan a la versión vigente (misma transacción)
+    version = publish_changes(db, label, keys)
+    if version is not None and response is not None:
+        response.headers["X-Price-Version"] = str(version["id"])
+    return version
+
+def _price_key(price: ServicePrice) -> tuple:
+    return (price.service_id, price.capacidad, price.period)
+
 @price_router.post("/services")
 def create_service(payload: dict, db: Session = Depends(get_db)):
     service = Service(
@@ -38,13 +76,16 @@ def create_service(payload: dict, db: Session = Depends(get_db)):
         active=True
     )
     db.add(service)
+    table_versions.bump(db, "services")
     db.commit()
     db.refresh(service)
+    refresh_price_matrix(db)
+    refresh_service_index(db)
     return service
         
 
 @price_router.post("")
-def create_price(payload: dict, db: Session = Depends(get_db)):
+def create_price(payload: dict, response: Response, db: Session = Depends(get_db)):
 
     service = db.get(Service, payload.get("service_id"))
     if not service:
@@ -59,18 +100,35 @@ def create_price(payload: dict, db: Session = Depends(get_db)):
     )
 
     db.add(price)
-    db.commit()
+    table_versions.bump(db, "service_prices")
+    try:
+        _auto_publish(db, f"auto: precio nuevo ({service.slug})", [_price_key(price)], response)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Ya existe un precio para esa capacidad y periodo")
     db.refresh(price)
+    refresh_price_matrix(db)
 
     return price
 
 @price_router.get("/services")
-def list_services(db: Session = Depends(get_db)):
+def list_services(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    etag, not_modified = table_versions.conditional_get(request, db, "services")
+    if not_modified:
+        return not_modified
+    response.headers.update(table_versions.etag_headers(etag))
+
     services = db.query(Service).order_by(Service.name.asc()).all()
     return services
 
 @price_router.get("")
-def list_prices(service_id: int, db: Session = Depends(get_db)):
+def list_prices(service_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    etag, not_modified = table_versions.conditional_get(request, db, "service_prices")
+    if not_modified:
+        return not_modified
+    response.headers.update(table_versions.etag_headers(etag))
+
     return (
         db.query(ServicePrice)
         .filter(ServicePrice.service_id == service_id)
@@ -78,32 +136,199 @@ def list_prices(service_id: int, db: Session = Depends(get_db)):
         .all()
     )
 
+# ================================
+# 📦 Hoja de tarifas completa (antes de /{price_id})
+# ================================
+
+def _sheet_error_detail(e: PriceSheetError) -> dict:
+    return {"message": str(e), "errors": e.errors[:200]}
+
+def _apply_bulk(db: Session, rows: list, replace: bool, dry_run: bool, publish: Optional[dict] = None) -> dict:
+    try:
+        result = apply_price_sheet(db, rows, replace=replace, create_services=True, dry_run=dry_run)
+    except PriceSheetError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=_sheet_error_detail(e))
+    except IntegrityError:
+        # Otro request creó el mismo servicio / precio en medio
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Los precios cambiaron mientras se aplicaba la hoja; reintenta")
+    changed_keys = result.pop("changed_keys")
+
+    if dry_run:
+        db.rollback()
+        return result
+
+    changed = result["inserted"] or result["updated"] or result["deleted"]
+    if publish is not None:
+        # Hoja + versión en la misma transacción
+        try:
+            result["price_version"] = publish_price_version(db, **publish)
+        except PriceVersionError as e:
+            db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+    elif changed:
+        result["price_version"] = _auto_publish(db, "auto: hoja de tarifas", changed_keys)
+
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Los precios cambiaron mientras se aplicaba la hoja; reintenta")
+
+    if changed or publish is not None:
+        refresh_price_matrix(db)
+    if result["services_created"]:
+        refresh_service_index(db)
+    return result
+
+@price_router.put("/bulk")
+async def bulk_upsert_prices(
+    request: Request,
+    replace: bool = False,
+    dry_run: bool = False,
+    sheet_name: Optional[str] = None,
+    publish: bool = False,
+    effective_from: Optional[str] = None,
+    label: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Aplica una hoja de tarifas (uno o varios servicios) en una transacción.
+
+    - JSON: {"prices": [{service_slug | service_id, capacidad, period, price_normal, price_discount?}]}
+      o {"services": [{"slug", "name"?, "prices": [...]}]} (con name crea el servicio si no existe)
+    - multipart: file=.csv / .xlsx con esas mismas columnas
+
+    replace=true borra los precios de esos servicios que no vengan en la hoja.
+    dry_run=true solo devuelve el diff.
+    publish=true además publica la hoja como versión (effective_from ISO, default ahora);
+    sin publish, si ya hay una versión vigente, solo las filas cambiadas se publican encima de ella.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "filename"):
+            raise HTTPException(status_code=400, detail="Falta el archivo (file)")
+        sheet_name = form.get("sheet_name") or sheet_name
+        filename = (upload.filename or "").lower()
+        if not filename.endswith((".csv", ".xlsx")):
+            raise HTTPException(status_code=400, detail="Solo se aceptan archivos .csv o .xlsx")
+
+        try:
+            spooled = await run_in_threadpool(spool_upload, upload.file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        try:
+            if filename.endswith(".csv"):
+                rows = rows_from_csv(spooled.read())
+            else:
+                rows = await run_in_threadpool(rows_from_xlsx, spooled, sheet_name)
+        except (ValueError, KeyError, BadZipFile) as e:
+            raise HTTPException(status_code=400, detail=f"Archivo inválido: {e}")
+        finally:
+            spooled.close()
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+        if isinstance(payload, list):
+            payload = {"prices": payload}
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail='Se espera {"prices": [...]} o {"services": [...]}')
+        try:
+            rows = rows_from_json(payload)
+        except PriceSheetError as e:
+            raise HTTPException(status_code=400, detail=_sheet_error_detail(e))
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="La hoja no tiene filas")
+
+    publish_args = {"label": label, "effective_from": effective_from} if publish else None
+    return await run_in_threadpool(_apply_bulk, db, rows, replace, dry_run, publish_args)
+
+# ================================
+# 🗓️ Versiones publicadas (antes de /{price_id})
+# ================================
+
+@price_router.get("/versions")
+def list_versions(db: Session = Depends(get_read_db)):
+    return list_price_versions(db)
+
+@price_router.post("/versions")
+def publish_version(payload: dict, db: Session = Depends(get_db)):
+    """
+    Congela las tarifas actuales como versión.
+    {"label"?: str, "effective_from"?: ISO-8601 (default ahora)}
+    """
+    try:
+        version = publish_price_version(db, payload.get("label"), payload.get("effective_from"))
+    except PriceVersionError as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    db.commit()
+    refresh_price_matrix(db)
+    return version
+
+@price_router.get("/versions/{version_id}")
+def get_version(version_id: int, db: Session = Depends(get_read_db)):
+    try:
+        return get_price_version(db, version_id)
+    except PriceVersionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@price_router.delete("/versions/{version_id}")
+def delete_version(version_id: int, db: Session = Depends(get_db)):
+    try:
+        delete_price_version(db, version_id)
+    except PriceVersionError as e:
+        db.rollback()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    db.commit()
+    refresh_price_matrix(db)
+    return {"status": "deleted"}
+
 @price_router.put("/{price_id}")
-def update_price(price_id: int, payload: dict, db: Session = Depends(get_db)):
+def update_price(price_id: int, payload: dict, response: Response, db: Session = Depends(get_db)):
 
     price = db.get(ServicePrice, price_id)
     if not price:
         raise HTTPException(status_code=404, detail="Price not found")
 
+    old_key = _price_key(price)
     price.capacidad = payload.get("capacidad", price.capacidad)
     price.period = payload.get("period", price.period)
     price.price_normal = payload.get("price_normal", price.price_normal)
     price.price_discount = payload.get("price_discount", price.price_discount)
+    table_versions.bump(db, "service_prices")
 
-    db.commit()
+    try:
+        _auto_publish(db, f"auto: precio {price_id} editado", [old_key, _price_key(price)], response)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Ya existe un precio para esa capacidad y periodo")
     db.refresh(price)
+    refresh_price_matrix(db)
 
     return price
 
 @price_router.delete("/{price_id}")
-def delete_price(price_id: int, db: Session = Depends(get_db)):
+def delete_price(price_id: int, response: Response, db: Session = Depends(get_db)):
 
     price = db.get(ServicePrice, price_id)
     if not price:
         raise HTTPException(status_code=404, detail="Price not found")
 
+    key = _price_key(price)
     db.delete(price)
+    table_versions.bump(db, "service_prices")
+    _auto_publish(db, f"auto: precio {price_id} eliminado", [key], response)
     db.commit()
+    refresh_price_matrix(db)
 
     return {"status": "deleted"}
 
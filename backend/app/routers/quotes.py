@@ -0,0 +1,121 @@
+# app/routers/quotes.py
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.deps import get_current_user
+from app.services.order_intake import SubmissionError, parse_destino
+from app.services.pricing_engine import PricingEngine
+from app.services.service_resolver import resolve_services
+from app.services.time_parser import duracion_horas
+
+# Límite de filas por request (listas de eventos / hojas de tarifas)
+QUOTE_BATCH_MAX_ROWS = int(os.getenv("QUOTE_BATCH_MAX_ROWS", "10000"))
+
+router = APIRouter(
+    prefix="/quotes",
+    tags=["Quotes"],
+    dependencies=[Depends(get_current_user)]
+)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.post("/batch")
+def quote_batch(payload: dict, db: Session = Depends(get_db)):
+    """
+    Cotiza una lista de viajes SIN crear órdenes.
+
+    Body:
+      {"rows": [{"destino": "...", "personas": 10,
+                 "hora_salida": "08:00", "hora_regreso": "20:00"}, ...]}
+    """
+    rows = payload.get("rows")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="'rows' debe ser una lista")
+
+    if len(rows) > QUOTE_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {QUOTE_BATCH_MAX_ROWS} filas por request"
+        )
+
+    # ================================
+    # 📥 Normalizar filas
+    # ================================
+    parsed, invalid = [], {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            row = {}
+        try:
+            pasajeros = int(row.get("personas", 0))
+        except (TypeError, ValueError):
+            pasajeros = 0
+        try:
+            destino = parse_destino(row)
+        except SubmissionError as e:
+            destino = ""
+            invalid[index] = e.detail
+        parsed.append((
+            destino,
+            pasajeros,
+            duracion_horas(row.get("hora_salida"), row.get("hora_regreso")),
+        ))
+
+    # ================================
+    # 🔎 Resolver servicios (una vez por destino distinto)
+    # ================================
+    services = resolve_services({destino for destino, _, _ in parsed}, db)
+
+    # ================================
+    # 💰 Pricing en una sola pasada
+    # ================================
+    engine = PricingEngine(db)
+    quotes = engine.calculate_many(
+        (services[destino].slug if services[destino] else None, pasajeros, duracion)
+        for destino, pasajeros, duracion in parsed
+    )
+
+    results = []
+    for index, ((destino, pasajeros, duracion), quote) in enumerate(zip(parsed, quotes)):
+        service = services[destino]
+        subtotal, capacidad_asignada, period = quote
+
+        item = {
+            "index": index,
+            "destino": destino,
+            "personas": pasajeros,
+            "service_resolved": service.slug if service else None,
+            "duracion": duracion,
+            "period": period,
+            "capacidad_asignada": capacidad_asignada,
+            "precio_total": subtotal,
+        }
+
+        if index in invalid:
+            item["error"] = invalid[index]
+            item["service_resolved"] = None
+            item["capacidad_asignada"] = None
+            item["precio_total"] = 0.0
+        elif pasajeros <= 0:
+            item["error"] = "Cantidad de pasajeros inválida"
+            item["capacidad_asignada"] = None
+            item["precio_total"] = 0.0
+        elif not service:
+            item["error"] = "No hay servicios configurados"
+        elif capacidad_asignada is None:
+            item["error"] = "No hay capacidades configuradas"
+
+        results.append(item)
+
+    return {
+        "count": len(results),
+        "price_version_id": engine.price_version_id,
+        "rows": results,
+    }
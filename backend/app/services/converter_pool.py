@@ -0,0 +1,377 @@
+# app/services/converter_pool.py
+"""
+Pool de workers LibreOffice headless de larga vida para DOCX → PDF.
+
+Cada worker tiene su propio perfil de usuario bajo un directorio del
+proceso (sin choques entre conversiones paralelas ni entre procesos) y
+mantiene un proceso soffice escuchando en un pipe UNO, así el arranque
+de LibreOffice se paga una vez y no por PDF.
+Si el módulo `uno` no está disponible, el worker cae a `soffice
+--convert-to` por job, pero sigue usando su perfil dedicado.
+"""
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+# ==== Config ====
+SOFFICE_BIN = os.getenv("SOFFICE_BIN", "soffice")
+# "auto" = un worker de LibreOffice por CPU
+_POOL_SIZE = os.getenv("PDF_POOL_SIZE", "2")
+PDF_POOL_SIZE = (os.cpu_count() or 1) if _POOL_SIZE == "auto" else int(_POOL_SIZE)
+PDF_JOB_TIMEOUT = float(os.getenv("PDF_JOB_TIMEOUT", "60"))
+PDF_POOL_ACQUIRE_TIMEOUT = float(os.getenv("PDF_POOL_ACQUIRE_TIMEOUT", "120"))
+PDF_WORKER_START_TIMEOUT = float(os.getenv("PDF_WORKER_START_TIMEOUT", "45"))
+PDF_WORKER_MAX_JOBS = int(os.getenv("PDF_WORKER_MAX_JOBS", "500"))
+PDF_POOL_DIR = os.getenv(
+    "PDF_POOL_DIR",
+    os.path.join(tempfile.gettempdir(), "mtcolectivo-libreoffice")
+)
+# En Debian python3-uno vive aquí; el python de la imagen no lo ve por defecto
+UNO_PYTHONPATH = os.getenv("UNO_PYTHONPATH", "/usr/lib/python3/dist-packages")
+
+
+class ConversionError(RuntimeError):
+    pass
+
+
+class ConversionTimeout(ConversionError):
+    pass
+
+
+def _load_uno():
+    try:
+        import uno
+        return uno
+    except ImportError:
+        pass
+
+    if UNO_PYTHONPATH and os.path.isdir(UNO_PYTHONPATH) and UNO_PYTHONPATH not in sys.path:
+        # Al final del path: nunca tapa paquetes instalados con pip
+        sys.path.append(UNO_PYTHONPATH)
+        try:
+            import uno
+            return uno
+        except ImportError:
+            pass
+
+    return None
+
+
+def _process_dir(pid: Optional[int] = None) -> str:
+    # Un directorio por proceso: varios workers de uvicorn (o un reinicio
+    # escalonado) en el mismo host no comparten perfil ni su lock
+    return os.path.join(PDF_POOL_DIR, f"pid-{pid or os.getpid()}")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # existe pero es de otro usuario
+    return True
+
+
+def _remove_stale_dirs() -> None:
+    """Borra los directorios de procesos que ya no existen (caídas sin shutdown)."""
+    try:
+        names = os.listdir(PDF_POOL_DIR)
+    except OSError:
+        return
+    for name in names:
+        if not name.startswith("pid-"):
+            continue
+        try:
+            pid = int(name[4:])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            shutil.rmtree(os.path.join(PDF_POOL_DIR, name), ignore_errors=True)
+
+
+def _file_url(path: str) -> str:
+    return "file://" + os.path.abspath(path).replace("\\", "/")
+
+
+class LibreOfficeWorker:
+    def __init__(self, index: int, uno_module=None):
+        self.index = index
+        self.uno = uno_module
+        self.profile_dir = os.path.join(_process_dir(), f"profile-{index}")
+        self.work_dir = os.path.join(_process_dir(), f"work-{index}")
+        self.pipe_name = f"mtcolectivo_lo_{os.getpid()}_{index}"
+
+        self.proc: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.jobs = 0
+        self.restarts = 0
+
+    # ---------- ciclo de vida ----------
+    def _base_cmd(self) -> list:
+        return [
+            SOFFICE_BIN,
+            f"-env:UserInstallation={_file_url(self.profile_dir)}",
+            "--headless", "--invisible", "--nologo", "--nodefault",
+            "--norestore", "--nolockcheck",
+        ]
+
+    def start(self) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.jobs = 0
+
+        if not self.uno:
+            return
+
+        accept = f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+        self.proc = subprocess.Popen(
+            self._base_cmd() + [accept],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        local = self.uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local
+        )
+        url = f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext"
+
+        deadline = time.monotonic() + PDF_WORKER_START_TIMEOUT
+        while True:
+            if self.proc.poll() is not None:
+                raise ConversionError(f"LibreOffice worker {self.index} terminó al arrancar")
+            try:
+                ctx = resolver.resolve(url)
+                self.desktop = ctx.ServiceManager.createInstanceWithContext(
+                    "com.sun.star.frame.Desktop", ctx
+                )
+                return
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionTimeout(f"LibreOffice worker {self.index} no respondió al arrancar")
+                time.sleep(0.25)
+
+    def stop(self) -> None:
+        self.desktop = None
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            proc.kill()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def restart(self) -> None:
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def healthy(self) -> bool:
+        if not self.uno:
+            return os.path.isdir(self.work_dir)
+        if self.proc is None or self.proc.poll() is not None or self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def ensure_running(self) -> None:
+        if self.jobs >= PDF_WORKER_MAX_JOBS:
+            # Reciclado periódico para contener fugas de memoria de soffice
+            self.stop()
+            self.start()
+        elif not self.healthy():
+            if self.proc is None and self.jobs == 0:
+                self.start()
+            else:
+                self.restart()
+
+    # ---------- conversión ----------
+    def convert(self, docx_bytes: bytes, timeout: float) -> bytes:
+        in_path = os.path.join(self.work_dir, "job.docx")
+        out_path = os.path.join(self.work_dir, "job.pdf")
+        for p in (in_path, out_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+        with open(in_path, "wb") as f:
+            f.write(docx_bytes)
+
+        self.jobs += 1
+        if self.uno:
+            self._convert_uno(in_path, out_path, timeout)
+        else:
+            self._convert_cli(in_path, timeout)
+
+        if not os.path.exists(out_path):
+            raise ConversionError("LibreOffice no generó el PDF")
+
+        with open(out_path, "rb") as f:
+            return f.read()
+
+    def _prop(self, name: str, value):
+        prop = self.uno.createUnoStruct("com.sun.star.beans.PropertyValue")
+        prop.Name = name
+        prop.Value = value
+        return prop
+
+    def _convert_uno(self, in_path: str, out_path: str, timeout: float) -> None:
+        error = []
+
+        def job():
+            try:
+                doc = self.desktop.loadComponentFromURL(
+                    _file_url(in_path), "_blank", 0, (self._prop("Hidden", True),)
+                )
+                if doc is None:
+                    raise ConversionError("LibreOffice no pudo abrir el DOCX")
+                try:
+                    doc.storeToURL(
+                        _file_url(out_path),
+                        (self._prop("FilterName", "writer_pdf_Export"),)
+                    )
+                finally:
+                    doc.close(True)
+            except Exception as e:
+                error.append(e)
+
+        t = threading.Thread(target=job, daemon=True)
+        t.start()
+        t.join(timeout)
+
+        if t.is_alive():
+            # Matar el proceso libera la llamada UNO bloqueada
+            self.stop()
+            raise ConversionTimeout(f"Conversión excedió {timeout:.0f}s")
+
+        if error:
+            if isinstance(error[0], ConversionError):
+                raise error[0]
+            raise ConversionError(str(error[0])) from error[0]
+
+    def _convert_cli(self, in_path: str, timeout: float) -> None:
+        cmd = self._base_cmd() + ["--convert-to", "pdf", "--outdir", self.work_dir, in_path]
+        try:
+            subprocess.run(
+                cmd,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired as e:
+            raise ConversionTimeout(f"Conversión excedió {timeout:.0f}s") from e
+        except subprocess.CalledProcessError as e:
+            raise ConversionError(e.stderr.decode("utf-8", errors="ignore") or str(e)) from e
+
+
+class ConverterPool:
+    def __init__(self, size: int = PDF_POOL_SIZE):
+        _remove_stale_dirs()
+        uno_module = _load_uno()
+        self.mode = "uno" if uno_module else "cli"
+        self.size = max(1, size)
+        self.workers = [LibreOfficeWorker(i, uno_module) for i in range(self.size)]
+
+        self._idle = queue.Queue()
+        for w in self.workers:
+            self._idle.put(w)
+
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, field: str) -> None:
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def convert(self, docx_bytes: bytes, timeout: Optional[float] = None) -> bytes:
+        timeout = timeout or PDF_JOB_TIMEOUT
+
+        try:
+            worker = self._idle.get(timeout=PDF_POOL_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise ConversionTimeout("Todos los workers de LibreOffice están ocupados")
+
+        try:
+            for attempt in (1, 2):
+                try:
+                    worker.ensure_running()
+                    pdf = worker.convert(docx_bytes, timeout)
+                    self._count("completed")
+                    return pdf
+                except ConversionTimeout:
+                    self._count("timeouts")
+                    worker.stop()
+                    raise
+                except ConversionError:
+                    # ¿Crash del proceso? se reinicia y se reintenta una vez
+                    if attempt == 2 or worker.healthy():
+                        self._count("failed")
+                        raise
+                    worker.stop()
+        finally:
+            self._idle.put(worker)
+
+    def health(self) -> dict:
+        return {
+            "mode": self.mode,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "workers": [
+                {
+                    "index": w.index,
+                    "running": w.proc is not None and w.proc.poll() is None,
+                    "jobs": w.jobs,
+                    "restarts": w.restarts,
+                }
+                for w in self.workers
+            ],
+        }
+
+    def shutdown(self) -> None:
+        for w in self.workers:
+            w.stop()
+        shutil.rmtree(_process_dir(), ignore_errors=True)
+
+
+# ================================
+# Pool del proceso (arranque perezoso)
+# ================================
+_pool: Optional[ConverterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_converter_pool() -> ConverterPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConverterPool()
+    return _pool
+
+
+def shutdown_converter_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+atexit.register(shutdown_converter_pool)
@@ -0,0 +1,223 @@
+# app/services/document_cache.py
+"""
+Cache direccionado por contenido para PDFs / DOCX generados.
+
+La llave es un hash de (versión de plantilla, mapping normalizado,
+texto_extra, formato), así una orden sin cambios se sirve sin volver a
+llenar la plantilla, componer ni pasar por LibreOffice.
+
+Dos niveles: LRU en memoria (acotado por bytes) y disco (acotado por
+tamaño, se expulsa lo usado hace más tiempo).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# ==== Config ====
+DOC_CACHE_ENABLED = os.getenv("DOC_CACHE_ENABLED", "1") not in ("0", "false", "False")
+DOC_CACHE_MEMORY_MB = float(os.getenv("DOC_CACHE_MEMORY_MB", "64"))
+DOC_CACHE_DISK_MB = float(os.getenv("DOC_CACHE_DISK_MB", "512"))
+DOC_CACHE_DIR = os.getenv(
+    "DOC_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "mtcolectivo-doc-cache")
+)
+
+# Subir si cambia la forma de generar documentos (invalida todo)
+CACHE_SCHEMA = 1
+
+
+def document_key(fmt: str, mapping: dict, texto_extra: Optional[str], template_version: str) -> str:
+    texto = texto_extra if texto_extra and texto_extra.strip() else ""
+    # El orden de las llaves se conserva: forma parte del llenado de la plantilla
+    items = [[str(k), "" if v is None else str(v)] for k, v in mapping.items()]
+    raw = json.dumps(
+        [CACHE_SCHEMA, template_version, fmt, items, texto],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    def __init__(
+        self,
+        directory: str = DOC_CACHE_DIR,
+        memory_bytes: int = int(DOC_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_bytes: int = int(DOC_CACHE_DISK_MB * 1024 * 1024),
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> bytes
+        self._memory_size = 0
+        self._disk = OrderedDict()     # key -> tamaño (orden = LRU)
+        self._disk_size = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_bytes > 0:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_disk_index()
+
+    # ---------- disco ----------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_disk_index(self) -> None:
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if len(name) != 64:
+                    continue  # temporales a medio escribir
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name, st.st_size))
+
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_size += len(data)
+            self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_size -= size
+            return None
+
+    # ---------- memoria ----------
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+                self.evictions += 1
+
+    # ---------- API ----------
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        data = self._read_disk(key) if self.disk_bytes > 0 else None
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, data)
+            return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.disk_bytes > 0:
+            self._write_disk(key, data)
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
+
+
+# ================================
+# Cache del proceso
+# ================================
+_cache: Optional[DocumentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache() -> Optional[DocumentCache]:
+    global _cache
+    if not DOC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocumentCache()
+    return _cache
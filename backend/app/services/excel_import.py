@@ -0,0 +1,220 @@
+# app/services/excel_import.py
+"""
+Importación masiva de órdenes desde .xlsx.
+
+- El upload se copia a un SpooledTemporaryFile (memoria hasta
+  EXCEL_SPOOL_MB, después disco) con límite de tamaño.
+- openpyxl en modo read-only: las filas se leen en streaming, nunca se
+  arma el DataFrame completo.
+- Cada bloque de EXCEL_IMPORT_CHUNK filas se cotiza de una pasada
+  (order_intake.build_orders) y se guarda en su propia transacción; si la
+  cotización del bloque falla se repite fila por fila y cada fila que falla
+  se reporta en errors.
+"""
+import os
+from datetime import date, datetime, time
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.services import rollup, table_versions
+from app.services.order_intake import SubmissionError, build_orders
+
+# ==== Config ====
+EXCEL_SPOOL_MB = float(os.getenv("EXCEL_SPOOL_MB", "4"))
+EXCEL_IMPORT_MAX_MB = float(os.getenv("EXCEL_IMPORT_MAX_MB", "50"))
+EXCEL_IMPORT_CHUNK = int(os.getenv("EXCEL_IMPORT_CHUNK", "500"))
+EXCEL_IMPORT_MAX_ERRORS = int(os.getenv("EXCEL_IMPORT_MAX_ERRORS", "1000"))
+
+_COPY_BLOCK = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def spool_upload(stream: BinaryIO, max_bytes: int = int(EXCEL_IMPORT_MAX_MB * 1024 * 1024)) -> SpooledTemporaryFile:
+    spooled = SpooledTemporaryFile(max_size=int(EXCEL_SPOOL_MB * 1024 * 1024))
+    size = 0
+    while True:
+        block = stream.read(_COPY_BLOCK)
+        if not block:
+            break
+        size += len(block)
+        if size > max_bytes:
+            spooled.close()
+            raise UploadTooLarge(f"El archivo excede {EXCEL_IMPORT_MAX_MB:g} MB")
+        spooled.write(block)
+    spooled.seek(0)
+    return spooled
+
+
+# ================================
+# Lectura en streaming
+# ================================
+
+def _cell(value):
+    # Valores de openpyxl → lo que espera el resto del código (texto / int)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime):
+        if value.date() == date(1899, 12, 30):  # hora sin fecha en Excel
+            return value.strftime("%H:%M")
+        return value.date().isoformat() if value.time() == time(0) else value.isoformat(sep=" ")
+    if isinstance(value, time):
+        return value.strftime("%H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def iter_sheet_rows(fileobj: BinaryIO, sheet_name: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+    """
+    (número de fila en Excel, {encabezado: valor}) por cada fila con datos.
+    La primera fila no vacía son los encabezados. Archivo inválido → ValueError.
+    """
+    # openpyxl se importa al usarse (arranque en frío más rápido)
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except InvalidFileException as e:
+        raise ValueError(str(e))
+    try:
+        if sheet_name:
+            if sheet_name not in wb.sheetnames:
+                raise ValueError(f"No existe la hoja '{sheet_name}'")
+            ws = wb[sheet_name]
+        else:
+            ws = wb.active
+
+        headers = None
+        for row_number, values in enumerate(ws.iter_rows(values_only=True), start=1):
+            if values is None or all(v is None or (isinstance(v, str) and not v.strip()) for v in values):
+                continue
+            if headers is None:
+                headers = ["" if v is None else str(v).strip() for v in values]
+                continue
+            yield row_number, {h: _cell(v) for h, v in zip(headers, values) if h}
+    finally:
+        wb.close()
+
+
+# ================================
+# Fila → payload de form-submit
+# ================================
+
+# Mismas columnas que la plantilla (&DIR_SALIDA&, &HOR_IDA&, ...) + los nombres del Form
+ROW_ALIASES = {
+    "nombre": ("nombre",),
+    "fecha": ("fecha",),
+    "direccion_salida": ("dir_salida", "dirsalida", "direccion_salida", "direccionsalida", "salida"),
+    "destino": ("dir_destino", "dirdestino", "destino"),
+    "hora_salida": ("hor_ida", "horida", "hora_salida", "horasalida", "hora_ida"),
+    "hora_regreso": ("hor_regreso", "horregreso", "hora_regreso", "horaregreso"),
+    "personas": ("personas", "pasajeros", "pax", "capacidadu"),
+}
+
+# Columnas que la orden guarda como texto (una celda numérica llega como int / float)
+NUMERIC_FIELDS = ("personas",)
+
+
+def row_to_payload(row: dict) -> dict:
+    # Misma normalización de encabezados que build_mapping_from_row
+    norm = {
+        str(k).strip().lower().replace(" ", "").replace("&", ""): v
+        for k, v in row.items()
+    }
+    payload = {}
+    for field, candidates in ROW_ALIASES.items():
+        for c in candidates:
+            value = norm.get(c)
+            if value not in (None, ""):
+                payload[field] = value if field in NUMERIC_FIELDS or isinstance(value, str) else str(value)
+                break
+    return payload
+
+
+# ================================
+# Importación
+# ================================
+
+def _build_chunk(db: Session, payloads: list) -> list:
+    try:
+        return build_orders(db, payloads)
+    except Exception:
+        db.rollback()
+
+    # Un valor inesperado no tumba el bloque: fila por fila para saber cuál falla
+    items = []
+    for payload in payloads:
+        try:
+            [item] = build_orders(db, [payload])
+        except Exception as e:
+            db.rollback()
+            item = SubmissionError(400, f"Fila inválida: {str(e)[:200]}")
+        items.append(item)
+    return items
+
+
+def import_orders(db: Session, fileobj: BinaryIO, sheet_name: Optional[str] = None, chunk_size: int = EXCEL_IMPORT_CHUNK) -> dict:
+    rows = iter_sheet_rows(fileobj, sheet_name)
+
+    total = created = failed = 0
+    errors = []
+
+    def report(row_number: int, detail: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < EXCEL_IMPORT_MAX_ERRORS:
+            errors.append({"row": row_number, "error": detail})
+
+    while True:
+        chunk = list(islice(rows, max(1, chunk_size)))
+        if not chunk:
+            break
+        total += len(chunk)
+
+        payloads = [row_to_payload(row) for _, row in chunk]
+        now = datetime.utcnow()
+        orders = []
+        numbers = []
+        for (row_number, _), item in zip(chunk, _build_chunk(db, payloads)):
+            if isinstance(item, SubmissionError):
+                report(row_number, item.detail)
+                continue
+            order, _ = item
+            order.created_at = now
+            orders.append(order)
+            numbers.append(row_number)
+
+        if not orders:
+            continue
+
+        try:
+            db.add_all(orders)
+            db.flush()
+            rollup.add_orders(db, orders)
+            table_versions.bump(db, "orders")
+            db.commit()
+            created += len(orders)
+        except Exception as e:
+            db.rollback()
+            for row_number in numbers:
+                report(row_number, f"No se pudo guardar: {str(e)[:200]}")
+        finally:
+            # Lo ya guardado no hace falta en la sesión (memoria acotada)
+            db.expunge_all()
+
+    return {
+        "rows": total,
+        "created": created,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
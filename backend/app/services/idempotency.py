@@ -0,0 +1,157 @@
+# app/services/idempotency.py
+"""
+Idempotencia de /orders/form-submit.
+
+Google Apps Script reintenta en timeouts; un reintento dentro de la
+ventana devuelve la respuesta original sin cotizar ni tocar orders.
+
+Dos niveles:
+- memoria: LRU acotado con TTL (réplicas calientes del mismo proceso)
+- tabla idempotency_keys: fuente de verdad compartida; la fila se
+  inserta en la MISMA transacción que la orden, así dos requests
+  simultáneos con la misma llave no pueden crear dos órdenes (el
+  segundo choca con la PK, hace rollback y devuelve la del primero).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+# ==== Config ====
+IDEMPOTENCY_WINDOW_SECONDS = int(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "86400"))
+IDEMPOTENCY_MEMORY_MAX = int(os.getenv("IDEMPOTENCY_MEMORY_MAX", "10000"))
+# Cada cuántas llaves nuevas se purgan las vencidas de la tabla
+IDEMPOTENCY_PRUNE_EVERY = int(os.getenv("IDEMPOTENCY_PRUNE_EVERY", "500"))
+
+Replay = Tuple[int, dict]
+
+
+def idempotency_key(scope: str, header_value: Optional[str], payload: dict) -> str:
+    """Llave explícita (header) o, si no viene, hash canónico del payload."""
+    if header_value and header_value.strip():
+        raw = f"{scope}:h:{header_value.strip()}"
+    else:
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        raw = f"{scope}:p:{body}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        window_seconds: int = IDEMPOTENCY_WINDOW_SECONDS,
+        memory_max: int = IDEMPOTENCY_MEMORY_MAX,
+    ):
+        self.window_seconds = window_seconds
+        self.memory_max = memory_max
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (expira_en, status_code, body)
+        self._since_prune = 0
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    # ---------- memoria ----------
+    def _memory_get(self, key: str) -> Optional[Replay]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, status_code, body = entry
+            if expires_at <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return status_code, body
+
+    def remember(self, key: str, status_code: int, body: dict, created_at: Optional[datetime] = None) -> None:
+        created = created_at or datetime.utcnow()
+        ttl = self.window_seconds - (datetime.utcnow() - created).total_seconds()
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (time.time() + ttl, status_code, body)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max:
+                self._memory.popitem(last=False)
+
+    # ---------- API ----------
+    def lookup(self, db: Session, key: str) -> Optional[Replay]:
+        """
+        Respuesta original si la llave está dentro de la ventana.
+        Una fila vencida con la misma llave se borra (sin commit) para
+        que el request actual pueda registrarse.
+        """
+        replay = self._memory_get(key)
+        if replay is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return replay
+
+        row = db.get(IdempotencyKey, key)
+        if row is not None:
+            if row.created_at >= datetime.utcnow() - timedelta(seconds=self.window_seconds):
+                body = json.loads(row.response)
+                self.remember(key, row.status_code, body, row.created_at)
+                with self._lock:
+                    self.db_hits += 1
+                return row.status_code, body
+            db.delete(row)
+            db.flush()
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def record(self, db: Session, key: str, status_code: int, body: dict) -> None:
+        """Agrega la llave a la transacción en curso. No hace commit."""
+        db.add(IdempotencyKey(
+            key=key,
+            status_code=status_code,
+            response=json.dumps(body, ensure_ascii=False, default=str),
+            created_at=datetime.utcnow(),
+        ))
+
+        with self._lock:
+            self._since_prune += 1
+            prune = self._since_prune >= IDEMPOTENCY_PRUNE_EVERY
+            if prune:
+                self._since_prune = 0
+        if prune:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+            }
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore()
+    return _store
@@ -0,0 +1,153 @@
+# app/services/order_intake.py
+"""
+Núcleo de /orders/form-submit: validar, resolver servicio, cotizar y armar
+la Order. Lo comparten el modo síncrono y el worker de la cola, así ambos
+producen exactamente la misma orden para el mismo payload.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.models import Order
+from app.services.price_matrix import get_price_timeline, snapshot_at
+from app.services.pricing_engine import PricingEngine
+from app.services.service_resolver import resolve_services
+from app.services.time_parser import duracion_horas
+
+
+class SubmissionError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_pasajeros(payload: dict) -> int:
+    try:
+        pasajeros = int(payload.get("personas", 0))
+    except (TypeError, ValueError):
+        pasajeros = 0
+
+    if pasajeros <= 0:
+        raise SubmissionError(400, "Cantidad de pasajeros inválida")
+    return pasajeros
+
+
+def parse_destino(payload: dict) -> str:
+    destino = payload.get("destino")
+    if destino is None:
+        return ""
+    if isinstance(destino, bool) or not isinstance(destino, (str, int, float)):
+        raise SubmissionError(400, "destino inválido")
+    # Un número (celda de Excel, form) se resuelve como texto
+    return destino if isinstance(destino, str) else str(destino)
+
+
+def validate_submission(payload: dict) -> int:
+    """Lo que se puede rechazar antes de cotizar. Devuelve los pasajeros."""
+    pasajeros = parse_pasajeros(payload)
+    parse_destino(payload)
+    for field in ("hora_salida", "hora_regreso"):
+        # Una lista / objeto no se puede guardar en la orden
+        if isinstance(payload.get(field), (list, dict)):
+            raise SubmissionError(400, f"{field} inválida")
+    return pasajeros
+
+
+def build_orders(
+    db: Session,
+    payloads: List[dict],
+    quoted_at: Optional[Sequence[Optional[datetime]]] = None,
+) -> List[Union[Tuple[Order, str], SubmissionError]]:
+    """
+    Cotiza un lote de envíos del Form en una sola pasada (resolver +
+    matriz de precios). Por cada payload devuelve (Order sin guardar,
+    slug del servicio) o el SubmissionError correspondiente.
+
+    quoted_at: momento de cotización de cada payload (default: ahora);
+    cada uno usa la versión de tarifas vigente en ese momento.
+    """
+    parsed = []
+    for payload in payloads:
+        destino = ""
+        try:
+            pasajeros = validate_submission(payload)
+            destino = parse_destino(payload)
+        except SubmissionError as e:
+            pasajeros = e
+        parsed.append((
+            payload,
+            destino,
+            pasajeros,
+            duracion_horas(payload.get("hora_salida"), payload.get("hora_regreso")),
+        ))
+
+    services = resolve_services({destino for _, destino, _, _ in parsed}, db)
+
+    # Una foto por versión: casi siempre todo el lote cae en la misma
+    timeline = get_price_timeline(db)
+    matrices = [snapshot_at(db, timeline, when) for when in (quoted_at or [None] * len(parsed))]
+    groups = {}
+    for idx, matrix in enumerate(matrices):
+        groups.setdefault(id(matrix), (matrix, []))[1].append(idx)
+
+    quotes = [None] * len(parsed)
+    for matrix, indexes in groups.values():
+        engine = PricingEngine(db, matrix=matrix)
+        group_quotes = engine.calculate_many(
+            (
+                services[parsed[i][1]].slug if services[parsed[i][1]] else None,
+                0 if isinstance(parsed[i][2], SubmissionError) else parsed[i][2],
+                parsed[i][3],
+            )
+            for i in indexes
+        )
+        for i, quote in zip(indexes, group_quotes):
+            quotes[i] = quote
+
+    results = []
+    for (payload, destino, pasajeros, duracion), (subtotal, capacidad_asignada, _), matrix in zip(parsed, quotes, matrices):
+        if isinstance(pasajeros, SubmissionError):
+            results.append(pasajeros)
+            continue
+
+        service = services[destino]
+        if not service:
+            results.append(SubmissionError(500, "No hay servicios configurados"))
+            continue
+        if capacidad_asignada is None:
+            results.append(SubmissionError(400, "No hay capacidades configuradas"))
+            continue
+
+        order = Order(
+            service_id=service.id,
+            nombre=payload.get("nombre"),
+            fecha=payload.get("fecha"),
+            dir_salida=payload.get("direccion_salida"),
+            dir_destino=destino,
+            hor_ida=payload.get("hora_salida"),
+            hor_regreso=payload.get("hora_regreso"),
+            duracion=duracion,
+            capacidadu=capacidad_asignada,
+            subtotal=subtotal,
+            descuento=0.0,
+            total=subtotal,
+            abonado=0.0,
+            liquidar=subtotal,
+            price_version_id=matrix.version_id,
+        )
+        results.append((order, service.slug))
+
+    return results
+
+
+def submission_result(order: Order, service_slug: str) -> dict:
+    """Respuesta de form-submit para una orden creada."""
+    return {
+        "status": "ok",
+        "order_id": order.id,
+        "service_resolved": service_slug,
+        "capacidad_asignada": order.capacidadu,
+        "precio_total": order.subtotal,
+    }
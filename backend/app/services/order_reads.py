@@ -0,0 +1,61 @@
+# app/services/order_reads.py
+"""
+Lecturas de órdenes sin hidratar el ORM.
+
+Se seleccionan solo las columnas que devuelve la API (tuplas) y cada
+fila pasa directo a dict, con created_at formateado en un paso. Los
+routers las devuelven con ORJSONResponse (sin jsonable_encoder).
+"""
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from app.models import Order
+
+# Mismo orden de llaves que serialize_order (created_at al final)
+ORDER_FIELDS = (
+    "id",
+    "nombre",
+    "fecha",
+    "dir_salida",
+    "dir_destino",
+    "hor_ida",
+    "hor_regreso",
+    "duracion",
+    "capacidadu",
+    "subtotal",
+    "descuento",
+    "total",
+    "abonado",
+    "fecha_abono",
+    "liquidar",
+    "texto_extra",
+    "created_at",
+)
+ORDER_COLUMNS = tuple(getattr(Order, field) for field in ORDER_FIELDS)
+
+
+def format_created_at(dt: Optional[datetime]) -> Optional[str]:
+    """UTC ISO-8601 con 'Z' (naive = ya está en UTC)."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat(timespec="seconds") + "Z"
+
+
+def order_row_to_dict(row) -> dict:
+    item = dict(zip(ORDER_FIELDS, row))
+    item["created_at"] = format_created_at(item["created_at"])
+    return item
+
+
+def order_rows_to_dicts(rows: Iterable) -> List[dict]:
+    fields = ORDER_FIELDS
+    fmt = format_created_at
+    out = []
+    append = out.append
+    for row in rows:
+        item = dict(zip(fields, row))
+        item["created_at"] = fmt(item["created_at"])
+        append(item)
+    return out
@@ -0,0 +1,414 @@
+# app/services/price_bulk.py
+"""
+Carga masiva de tarifas (PUT /service-prices/bulk y seed.py).
+
+La hoja (JSON, CSV o XLSX) se normaliza a filas
+(servicio, capacidad, periodo, precio, descuento), se compara contra
+lo que hay en la base (una sola consulta) y los cambios se aplican con
+INSERT … ON CONFLICT sobre uq_service_prices_lookup + un DELETE
+opcional, todo en la transacción del que llama.
+"""
+import csv
+import io
+import math
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Service, ServicePrice
+from app.services import table_versions
+
+PERIODS = ("same_day", "weekend", "long_weekend")
+
+# Máximo de cambios que se listan en la respuesta (los conteos son exactos)
+MAX_CHANGES_LISTED = 1000
+
+# Filas por INSERT multi-VALUES (5 parámetros por fila; SQLite admite 32766)
+UPSERT_CHUNK = 1000
+
+# Encabezados aceptados en CSV / XLSX (minúsculas, sin espacios)
+COLUMN_ALIASES = {
+    "service_id": ("service_id", "servicio_id"),
+    "service_slug": ("service_slug", "slug", "servicio"),
+    "service_name": ("service_name", "nombre_servicio"),
+    "capacidad": ("capacidad", "pax", "pasajeros"),
+    "period": ("period", "periodo"),
+    "price_normal": ("price_normal", "precio", "precio_normal"),
+    "price_discount": ("price_discount", "descuento", "precio_descuento"),
+}
+
+Key = Tuple[int, int, str]
+
+
+class PriceSheetError(Exception):
+    """Hoja inválida: errores por fila (el endpoint responde 400)."""
+
+    def __init__(self, errors: List[dict]):
+        super().__init__(f"{len(errors)} fila(s) inválida(s)")
+        self.errors = errors
+
+
+# ================================
+# Entrada → filas
+# ================================
+
+def rows_from_json(payload: dict) -> List[dict]:
+    """
+    {"prices": [{service_id | service_slug, capacidad, period, price_normal, price_discount?}, ...]}
+    o {"services": [{"slug", "name"?, "prices": [{capacidad, period, ...}, ...]}, ...]}
+
+    Elementos que no son objetos (o listas que no son listas) → PriceSheetError,
+    con la misma numeración de filas que _validate.
+    """
+    rows, errors = [], []
+
+    def add(item, defaults: Optional[dict] = None) -> None:
+        number = len(rows) + len(errors) + 1
+        if not isinstance(item, dict):
+            errors.append({"row": number, "errors": ["la fila debe ser un objeto"]})
+            return
+        row = dict(item)
+        for key, value in (defaults or {}).items():
+            row.setdefault(key, value)
+        rows.append(row)
+
+    prices = payload.get("prices") or []
+    if not isinstance(prices, list):
+        raise PriceSheetError([{"row": None, "errors": ['"prices" debe ser una lista']}])
+    for item in prices:
+        add(item)
+
+    services = payload.get("services") or []
+    if not isinstance(services, list):
+        raise PriceSheetError([{"row": None, "errors": ['"services" debe ser una lista']}])
+    for index, service in enumerate(services, start=1):
+        service_prices = service.get("prices") or [] if isinstance(service, dict) else None
+        if not isinstance(service_prices, list):
+            errors.append({"row": None, "service": index, "errors": ['el servicio debe ser un objeto con "prices" (lista)']})
+            continue
+        defaults = {"service_id": service.get("id"), "service_slug": service.get("slug"), "service_name": service.get("name")}
+        for item in service_prices:
+            add(item, defaults)
+
+    if errors:
+        raise PriceSheetError(errors)
+    return rows
+
+
+def _normalize_headers(row: dict) -> dict:
+    norm = {str(k).strip().lower().replace(" ", "_"): v for k, v in row.items() if k is not None}
+    out = {}
+    for field, candidates in COLUMN_ALIASES.items():
+        for c in candidates:
+            if norm.get(c) not in (None, ""):
+                out[field] = norm[c]
+                break
+    return out
+
+
+def rows_from_csv(data: bytes) -> List[dict]:
+    text = data.decode("utf-8-sig")
+    dialect = csv.excel
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        pass
+    return [_normalize_headers(row) for row in csv.DictReader(io.StringIO(text), dialect=dialect)]
+
+
+def rows_from_xlsx(fileobj: BinaryIO, sheet_name: Optional[str] = None) -> List[dict]:
+    from app.services.excel_import import iter_sheet_rows
+
+    return [_normalize_headers(row) for _, row in iter_sheet_rows(fileobj, sheet_name)]
+
+
+# ================================
+# Validación
+# ================================
+
+def _to_int(value) -> int:
+    number = float(str(value).replace(",", "").strip())
+    if not number.is_integer():
+        raise ValueError
+    return int(number)
+
+
+def _to_float(value) -> float:
+    number = float(str(value).replace(",", "").replace("$", "").strip())
+    if not math.isfinite(number):
+        raise ValueError
+    return number
+
+
+def _resolve_services(db: Session, rows: List[dict], create_services: bool) -> Tuple[Dict[str, int], set, List[dict]]:
+    """(id por slug, ids existentes, servicios nuevos). Una consulta."""
+    slugs = {str(r["service_slug"]).strip() for r in rows if r.get("service_slug") not in (None, "")}
+    ids = set()
+    for r in rows:
+        try:
+            ids.add(_to_int(r["service_id"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    by_slug, known_ids = {}, set()
+    if slugs or ids:
+        found = db.execute(
+            select(Service.id, Service.slug).where(Service.slug.in_(list(slugs)) | Service.id.in_(list(ids)))
+        ).all()
+        by_slug = {slug: service_id for service_id, slug in found}
+        known_ids = {service_id for service_id, _ in found}
+
+    new_services = []
+    if create_services:
+        names = {}
+        for r in rows:
+            slug = str(r.get("service_slug") or "").strip()
+            if slug and slug not in by_slug and r.get("service_name"):
+                names.setdefault(slug, str(r["service_name"]).strip())
+        new_services = [{"slug": slug, "name": name, "active": True} for slug, name in names.items()]
+    return by_slug, known_ids, new_services
+
+
+def _validate(rows: List[dict], by_slug: Dict[str, int], known_ids: set, pending_slugs: set) -> Tuple[List[dict], List[dict]]:
+    valid, errors = [], []
+    seen: Dict[Tuple, int] = {}
+
+    for number, raw in enumerate(rows, start=1):
+        problems = []
+
+        service_ref = None
+        slug = str(raw.get("service_slug") or "").strip()
+        if raw.get("service_id") not in (None, ""):
+            try:
+                service_ref = _to_int(raw["service_id"])
+                if service_ref not in known_ids:
+                    problems.append(f"service_id {service_ref} no existe")
+            except (TypeError, ValueError):
+                problems.append("service_id inválido")
+        elif slug:
+            service_ref = by_slug.get(slug, slug if slug in pending_slugs else None)
+            if service_ref is None:
+                problems.append(f"servicio '{slug}' no existe")
+        else:
+            problems.append("falta service_id o service_slug")
+
+        try:
+            capacidad = _to_int(raw.get("capacidad"))
+            if capacidad <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            capacidad = None
+            problems.append("capacidad debe ser un entero > 0")
+
+        period = str(raw.get("period") or "").strip().lower()
+        if period not in PERIODS:
+            problems.append(f"period debe ser uno de {', '.join(PERIODS)}")
+
+        try:
+            price_normal = _to_float(raw.get("price_normal"))
+            if price_normal < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            price_normal = None
+            problems.append("price_normal debe ser un número >= 0")
+
+        price_discount = None
+        if raw.get("price_discount") not in (None, ""):
+            try:
+                price_discount = _to_float(raw["price_discount"])
+            except (TypeError, ValueError):
+                problems.append("price_discount debe ser un número")
+
+        if not problems:
+            key = (service_ref, capacidad, period)
+            if key in seen:
+                problems.append(f"duplicada con la fila {seen[key]}")
+            else:
+                seen[key] = number
+
+        if problems:
+            errors.append({"row": number, "errors": problems})
+            continue
+
+        valid.append({
+            "service_id": service_ref,   # id o slug de un servicio por crear
+            "capacidad": capacidad,
+            "period": period,
+            "price_normal": price_normal,
+            "price_discount": price_discount,
+        })
+    return valid, errors
+
+
+# ================================
+# Upsert
+# ================================
+
+def _write(db: Session, rows: List[dict], only_missing: bool) -> None:
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        index_elements = ["service_id", "capacidad", "period"]
+
+        # Un INSERT … VALUES (…), (…) … ON CONFLICT por bloque
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            stmt = insert_(ServicePrice).values(rows[start:start + UPSERT_CHUNK])
+            if only_missing:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            else:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={
+                        "price_normal": stmt.excluded.price_normal,
+                        "price_discount": stmt.excluded.price_discount,
+                    },
+                )
+            db.execute(stmt)
+        return
+
+    # Otros motores: fila por fila con el ORM
+    for row in rows:
+        existing = db.execute(
+            select(ServicePrice).where(
+                ServicePrice.service_id == row["service_id"],
+                ServicePrice.capacidad == row["capacidad"],
+                ServicePrice.period == row["period"],
+            )
+        ).scalar_one_or_none()
+        if existing is None:
+            db.add(ServicePrice(**row))
+        elif not only_missing:
+            existing.price_normal = row["price_normal"]
+            existing.price_discount = row["price_discount"]
+    db.flush()
+
+
+def apply_price_sheet(
+    db: Session,
+    rows: Iterable[dict],
+    replace: bool = False,
+    only_missing: bool = False,
+    create_services: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Aplica la hoja. No hace commit.
+
+    - replace: borra los precios de los servicios incluidos que no vienen en la hoja
+    - only_missing: solo inserta lo que falta (ON CONFLICT DO NOTHING), como el seed
+    - create_services: crea servicios nuevos si la fila trae slug + nombre
+    - dry_run: solo calcula el diff
+
+    PriceSheetError si alguna fila es inválida (no se aplica nada); `row`
+    es el número de fila de datos, sin contar encabezados.
+    """
+    rows = list(rows)
+    by_slug, known_ids, new_services = _resolve_services(db, rows, create_services)
+    valid, errors = _validate(rows, by_slug, known_ids, {s["slug"] for s in new_services})
+    if errors:
+        raise PriceSheetError(errors)
+
+    # Servicios nuevos: un INSERT y sus ids
+    if new_services and not dry_run:
+        db.execute(insert(Service), new_services)
+        created = db.execute(
+            select(Service.id, Service.slug).where(Service.slug.in_([s["slug"] for s in new_services]))
+        ).all()
+        by_slug.update({slug: service_id for service_id, slug in created})
+        for row in valid:
+            if isinstance(row["service_id"], str):
+                row["service_id"] = by_slug[row["service_id"]]
+
+    # Estado actual de los servicios de la hoja: una consulta
+    service_ids = {row["service_id"] for row in valid if isinstance(row["service_id"], int)}
+    current: Dict[Key, Tuple[int, float, Optional[float]]] = {}
+    if service_ids:
+        for price_id, service_id, capacidad, period, normal, discount in db.execute(
+            select(
+                ServicePrice.id,
+                ServicePrice.service_id,
+                ServicePrice.capacidad,
+                ServicePrice.period,
+                ServicePrice.price_normal,
+                ServicePrice.price_discount,
+            ).where(ServicePrice.service_id.in_(list(service_ids)))
+        ):
+            current[(service_id, capacidad, period)] = (price_id, normal, discount)
+
+    to_write, changes = [], []
+    inserted = updated = unchanged = 0
+    sheet_keys = set()
+
+    for row in valid:
+        key = (row["service_id"], row["capacidad"], row["period"])
+        sheet_keys.add(key)
+        existing = current.get(key)
+
+        if existing is None:
+            if row["price_discount"] is None:
+                row["price_discount"] = 0.0
+            inserted += 1
+            action = "insert"
+        else:
+            _, normal, discount = existing
+            if row["price_discount"] is None:
+                row["price_discount"] = discount   # no viene en la hoja → se conserva
+            if only_missing or (normal == row["price_normal"] and discount == row["price_discount"]):
+                unchanged += 1
+                continue
+            updated += 1
+            action = "update"
+
+        to_write.append(row)
+        if len(changes) < MAX_CHANGES_LISTED:
+            changes.append({"action": action, **row})
+
+    to_delete, deleted_keys = [], []
+    if replace:
+        for key, (price_id, normal, discount) in current.items():
+            if key not in sheet_keys:
+                to_delete.append(price_id)
+                deleted_keys.append(key)
+                if len(changes) < MAX_CHANGES_LISTED:
+                    service_id, capacidad, period = key
+                    changes.append({
+                        "action": "delete",
+                        "service_id": service_id,
+                        "capacidad": capacidad,
+                        "period": period,
+                        "price_normal": normal,
+                        "price_discount": discount,
+                    })
+
+    if not dry_run:
+        _write(db, to_write, only_missing)
+        if to_delete:
+            db.execute(
+                delete(ServicePrice)
+                .where(ServicePrice.id.in_(to_delete))
+                .execution_options(synchronize_session=False)
+            )
+        touched = (["service_prices"] if to_write or to_delete else []) + (["services"] if new_services else [])
+        if touched:
+            table_versions.bump(db, *touched)
+
+    return {
+        "rows": len(rows),
+        "services_created": len(new_services),
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": len(to_delete),
+        "unchanged": unchanged,
+        "dry_run": dry_run,
+        "changes": changes,
+        "changes_truncated": inserted + updated + len(to_delete) > len(changes),
+        # Para publish_changes; no se serializa (el router lo saca)
+        "changed_keys": [] if dry_run else [
+            (row["service_id"], row["capacidad"], row["period"]) for row in to_write
+        ] + deleted_keys,
+    }
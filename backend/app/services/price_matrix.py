@@ -0,0 +1,358 @@
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import PriceVersion, PriceVersionItem, Service, ServicePrice
+
+# Cada cuántos segundos se revisa si otra réplica publicó / editó tarifas (0 = nunca)
+PRICE_SNAPSHOT_POLL = float(os.getenv("PRICE_SNAPSHOT_POLL", "30"))
+
+# Contadores de table_versions que invalidan la foto
+_STAMP_TABLES = ("services", "service_prices", "price_versions")
+
+# Versiones viejas cargadas bajo demanda (cola atrasada, explicaciones)
+PRICE_HISTORY_MAX = int(os.getenv("PRICE_HISTORY_MAX", "16"))
+
+
+class ServicePricing:
+    """
+    Tarifas compiladas de un servicio activo (inmutable).
+
+    - capacidades: capacidades distintas, ordenadas ascendente
+    - prices: (capacidad, period) → price_normal
+    - fallback: capacidad → price_normal del primer registro (id más bajo)
+    """
+
+    __slots__ = ("service_id", "slug", "capacidades", "prices", "fallback")
+
+    def __init__(
+        self,
+        service_id: int,
+        slug: str,
+        capacidades: Tuple[int, ...],
+        prices: Mapping[Tuple[int, str], float],
+        fallback: Mapping[int, float],
+    ):
+        self.service_id = service_id
+        self.slug = slug
+        self.capacidades = capacidades
+        self.prices = MappingProxyType(dict(prices))
+        self.fallback = MappingProxyType(dict(fallback))
+
+    def assign_capacidad(self, pasajeros: int) -> Optional[int]:
+        if not self.capacidades:
+            return None
+
+        # 🔥 Capacidad mínima suficiente, o la mayor si nadie alcanza
+        idx = bisect_left(self.capacidades, pasajeros)
+        if idx < len(self.capacidades):
+            return self.capacidades[idx]
+        return self.capacidades[-1]
+
+    def quote(self, pasajeros: int, period: str) -> Tuple[float, Optional[int]]:
+        capacidad = self.assign_capacidad(pasajeros)
+        if capacidad is None:
+            return 0.0, None
+
+        price = self.prices.get((capacidad, period))
+        if price is None:
+            price = self.fallback.get(capacidad)
+        if price is None:
+            return 0.0, capacidad
+
+        return price, capacidad
+
+
+class PriceMatrix:
+    """
+    Snapshot inmutable de tarifas indexado por slug.
+    Solo incluye servicios activos (igual que el PricingEngine original).
+
+    version_id / effective_from: versión publicada de la que sale
+    (None = service_prices en vivo, cuando no hay versión vigente).
+    """
+
+    __slots__ = ("services", "version_id", "effective_from")
+
+    def __init__(
+        self,
+        services: Mapping[str, ServicePricing],
+        version_id: Optional[int] = None,
+        effective_from: Optional[datetime] = None,
+    ):
+        self.services = MappingProxyType(dict(services))
+        self.version_id = version_id
+        self.effective_from = effective_from
+
+    def get(self, slug: str) -> Optional[ServicePricing]:
+        return self.services.get(slug)
+
+    @classmethod
+    def compile(
+        cls,
+        services: Iterable[Tuple[int, str]],
+        rows: Iterable[Tuple[int, int, str, float]],
+        version_id: Optional[int] = None,
+        effective_from: Optional[datetime] = None,
+    ) -> "PriceMatrix":
+        """rows: (service_id, capacidad, period, price_normal) por id de origen ascendente."""
+        by_service = {}
+        for service_id, capacidad, period, price_normal in rows:
+            if capacidad is None:
+                continue
+            by_service.setdefault(service_id, []).append(
+                (capacidad, period, float(price_normal or 0.0))
+            )
+
+        compiled = {}
+        for service_id, slug in services:
+            prices = {}
+            fallback = {}
+            # Las filas vienen por id ascendente: el primero gana
+            for capacidad, period, price in by_service.get(service_id, ()):
+                prices.setdefault((capacidad, period), price)
+                fallback.setdefault(capacidad, price)
+
+            compiled[slug] = ServicePricing(
+                service_id=service_id,
+                slug=slug,
+                capacidades=tuple(sorted(fallback)),
+                prices=prices,
+                fallback=fallback,
+            )
+
+        return cls(compiled, version_id, effective_from)
+
+    @classmethod
+    def from_db(cls, db: Session) -> "PriceMatrix":
+        """service_prices en vivo (tarifas sin versionar)."""
+        rows = (
+            db.query(
+                ServicePrice.service_id,
+                ServicePrice.capacidad,
+                ServicePrice.period,
+                ServicePrice.price_normal,
+            )
+            .order_by(ServicePrice.id.asc())
+            .all()
+        )
+        return cls.compile(_active_services(db), rows)
+
+    @classmethod
+    def from_version(cls, db: Session, version: PriceVersion, include_inactive: bool = False) -> "PriceMatrix":
+        # include_inactive: para explicar órdenes viejas de servicios ya desactivados
+        services = db.query(Service.id, Service.slug).all() if include_inactive else _active_services(db)
+        return cls.compile(
+            services,
+            _version_rows(db, version.id),
+            version_id=version.id,
+            effective_from=version.effective_from,
+        )
+
+
+def _active_services(db: Session):
+    return (
+        db.query(Service.id, Service.slug)
+        .filter(Service.active == True)
+        .all()
+    )
+
+
+def _version_rows(db: Session, version_id: int):
+    return (
+        db.query(
+            PriceVersionItem.service_id,
+            PriceVersionItem.capacidad,
+            PriceVersionItem.period,
+            PriceVersionItem.price_normal,
+        )
+        .filter(PriceVersionItem.version_id == version_id)
+        .order_by(PriceVersionItem.price_id.asc())
+        .all()
+    )
+
+
+class PriceTimeline:
+    """
+    Fotos por fecha de vigencia: la versión vigente al construirla + las
+    programadas a futuro. at(t) es un bisect, sin locks ni DB; si todavía
+    no rige ninguna versión se usa `live` (service_prices en vivo).
+    """
+
+    __slots__ = ("starts", "matrices", "live", "stamp")
+
+    def __init__(self, versions: Tuple[PriceMatrix, ...], live: Optional[PriceMatrix], stamp: dict):
+        self.starts = tuple(m.effective_from for m in versions)
+        self.matrices = versions
+        self.live = live
+        self.stamp = stamp
+
+    def covers(self, when: datetime) -> bool:
+        # Antes de la primera versión cargada solo sirve `live` si no había vigente
+        return self.live is not None or (bool(self.starts) and when >= self.starts[0])
+
+    def at(self, when: Optional[datetime] = None) -> PriceMatrix:
+        idx = bisect_right(self.starts, when or datetime.utcnow())
+        if idx:
+            return self.matrices[idx - 1]
+        return self.live if self.live is not None else PriceMatrix({})
+
+    @classmethod
+    def from_db(cls, db: Session) -> "PriceTimeline":
+        from app.services.table_versions import current_versions
+
+        # Contadores primero: una escritura en medio solo provoca otro rebuild
+        stamp = current_versions(db, *_STAMP_TABLES)
+        now = datetime.utcnow()
+
+        current = (
+            db.query(PriceVersion)
+            .filter(PriceVersion.effective_from <= now)
+            .order_by(PriceVersion.effective_from.desc(), PriceVersion.id.desc())
+            .first()
+        )
+        scheduled = (
+            db.query(PriceVersion)
+            .filter(PriceVersion.effective_from > now)
+            .order_by(PriceVersion.effective_from.asc(), PriceVersion.id.asc())
+            .all()
+        )
+
+        versions = ([current] if current is not None else []) + scheduled
+        matrices = tuple(PriceMatrix.from_version(db, v) for v in versions)
+        # Sin versión vigente: tarifas en vivo hasta que rija la primera
+        live = PriceMatrix.from_db(db) if current is None else None
+        return cls(matrices, live, stamp)
+
+
+# ================================
+# Cache de proceso (write-through)
+# ================================
+_timeline: Optional[PriceTimeline] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+# version_id → PriceMatrix; lo publicado no cambia, se limpia en cada swap
+_history = {}
+
+
+def _refresh_in_background() -> None:
+    from app.database import SessionLocal
+
+    global _timeline
+    db = SessionLocal()
+    try:
+        _timeline = PriceTimeline.from_db(db)
+        _history.clear()
+    except Exception:
+        pass  # se reintenta en el siguiente poll
+    finally:
+        db.close()
+        _lock.release()
+
+
+def _maybe_poll(db: Session, timeline: PriceTimeline) -> None:
+    """
+    Cada PRICE_SNAPSHOT_POLL s compara los contadores (lectura por PK);
+    si cambiaron (otra réplica publicó), reconstruye en otro hilo. Nadie
+    espera: mientras tanto se sigue usando la foto actual.
+    """
+    global _checked_at
+    now = time.monotonic()
+    if PRICE_SNAPSHOT_POLL <= 0 or now - _checked_at < PRICE_SNAPSHOT_POLL:
+        return
+    if not _lock.acquire(blocking=False):
+        return
+
+    _checked_at = now
+    try:
+        from app.services.table_versions import current_versions
+
+        stale = current_versions(db, *_STAMP_TABLES) != timeline.stamp
+    except Exception:
+        stale = False
+    if not stale:
+        _lock.release()
+        return
+    threading.Thread(target=_refresh_in_background, name="price-snapshot", daemon=True).start()
+
+
+def get_price_timeline(db: Session) -> PriceTimeline:
+    timeline = _timeline
+    if timeline is None:
+        with _lock:
+            timeline = _timeline
+            if timeline is None:
+                timeline = _set_timeline(PriceTimeline.from_db(db))
+        return timeline
+    _maybe_poll(db, timeline)
+    return timeline
+
+
+def _historic_matrix(db: Session, when: datetime) -> PriceMatrix:
+    version = (
+        db.query(PriceVersion)
+        .filter(PriceVersion.effective_from <= when)
+        .order_by(PriceVersion.effective_from.desc(), PriceVersion.id.desc())
+        .first()
+    )
+    if version is None:
+        # Antes de versionar no hay foto: la más cercana es la primera publicada
+        version = (
+            db.query(PriceVersion)
+            .order_by(PriceVersion.effective_from.asc(), PriceVersion.id.asc())
+            .first()
+        )
+    if version is None:
+        return PriceMatrix({})
+
+    matrix = _history.get(version.id)
+    if matrix is None:
+        matrix = PriceMatrix.from_version(db, version)
+        if len(_history) >= PRICE_HISTORY_MAX:
+            _history.clear()
+        _history[version.id] = matrix
+    return matrix
+
+
+def snapshot_at(db: Session, timeline: PriceTimeline, when: Optional[datetime] = None) -> PriceMatrix:
+    """Foto vigente en `when`; fuera de la línea de tiempo cargada va a la DB."""
+    if when is None or timeline.covers(when):
+        return timeline.at(when)
+    return _historic_matrix(db, when)
+
+
+def get_price_matrix(db: Session, at: Optional[datetime] = None) -> PriceMatrix:
+    """
+    Foto de tarifas vigente en `at` (default: ahora). Solo toca la DB la
+    primera vez, tras una invalidación, cuando el poll detecta cambios o
+    si `at` es anterior a la versión vigente al armar la foto.
+    """
+    return snapshot_at(db, get_price_timeline(db), at)
+
+
+def _set_timeline(timeline: PriceTimeline) -> PriceTimeline:
+    global _timeline, _checked_at
+    _timeline = timeline
+    _checked_at = time.monotonic()
+    _history.clear()
+    return timeline
+
+
+def refresh_price_matrix(db: Session) -> PriceMatrix:
+    # Se arma aparte y se publica con una sola asignación (swap atómico)
+    timeline = PriceTimeline.from_db(db)
+    with _lock:
+        _set_timeline(timeline)
+    return timeline.at()
+
+
+def invalidate_price_matrix() -> None:
+    global _timeline
+    _timeline = None
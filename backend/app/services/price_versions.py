@@ -0,0 +1,273 @@
+# app/services/price_versions.py
+"""
+Versiones de tarifas con fecha de vigencia.
+
+service_prices es la hoja de trabajo; publicar copia su contenido a
+price_version_items (un INSERT … SELECT) bajo una nueva versión con
+effective_from. El pricing lee la versión vigente al momento de cotizar
+desde la foto en memoria (price_matrix), así que publicar no bloquea
+los form-submit; cada orden guarda price_version_id para poder explicar
+después con qué tarifa se cotizó.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple, Union
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import Order, PriceVersion, PriceVersionItem, Service, ServicePrice
+from app.services import table_versions
+from app.services.order_reads import format_created_at
+from app.services.price_matrix import PriceMatrix
+from app.services.pricing_engine import PricingEngine
+
+# Margen para relojes desfasados al publicar "ahora"
+PUBLISH_CLOCK_SKEW = timedelta(seconds=60)
+
+# (service_id, capacidad, period): identifica una tarifa entre versiones
+PriceKey = Tuple[int, int, str]
+
+
+class PriceVersionError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_effective_from(value: Union[str, datetime, None]) -> datetime:
+    """ISO-8601 → datetime UTC naive (como el resto de la base). None = ahora."""
+    if value is None or value == "":
+        return datetime.utcnow()
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            raise PriceVersionError(400, "effective_from inválido (ISO-8601)")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _status(version: PriceVersion, active_id: Optional[int], now: datetime) -> str:
+    if version.effective_from > now:
+        return "scheduled"
+    return "active" if version.id == active_id else "superseded"
+
+
+def _active_id(db: Session, now: datetime) -> Optional[int]:
+    return db.execute(
+        select(PriceVersion.id)
+        .where(PriceVersion.effective_from <= now)
+        .order_by(PriceVersion.effective_from.desc(), PriceVersion.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def serialize_version(version: PriceVersion, items: int, status: str) -> dict:
+    return {
+        "id": version.id,
+        "label": version.label,
+        "effective_from": format_created_at(version.effective_from),
+        "created_at": format_created_at(version.created_at),
+        "items": items,
+        "status": status,
+    }
+
+
+def publish_price_version(
+    db: Session,
+    label: Optional[str] = None,
+    effective_from: Union[str, datetime, None] = None,
+) -> dict:
+    """
+    Congela service_prices como nueva versión. No hace commit (va en la
+    transacción del que llama, p. ej. junto con la hoja del bulk).
+    """
+    now = datetime.utcnow()
+    effective_from = parse_effective_from(effective_from) if effective_from else now
+    if effective_from < now - PUBLISH_CLOCK_SKEW:
+        # Con vigencia pasada cambiaría la tarifa de envíos ya recibidos
+        raise PriceVersionError(400, "effective_from no puede estar en el pasado")
+    effective_from = max(effective_from, now)
+
+    version = PriceVersion(label=label, effective_from=effective_from, created_at=now)
+    db.add(version)
+    db.flush()
+
+    result = db.execute(
+        insert(PriceVersionItem).from_select(
+            ["version_id", "service_id", "capacidad", "period", "price_normal", "price_discount", "price_id"],
+            select(
+                literal(version.id),
+                ServicePrice.service_id,
+                ServicePrice.capacidad,
+                ServicePrice.period,
+                ServicePrice.price_normal,
+                ServicePrice.price_discount,
+                ServicePrice.id,
+            ).where(ServicePrice.capacidad.isnot(None)),
+        )
+    )
+    items = result.rowcount
+    if not items:
+        raise PriceVersionError(400, "No hay tarifas para publicar")
+
+    table_versions.bump(db, "price_versions")
+    return serialize_version(version, items, "scheduled" if effective_from > now else "active")
+
+
+def publish_changes(db: Session, label: str, keys: Iterable[PriceKey]) -> Optional[dict]:
+    """
+    Desde la primera versión el pricing solo lee versiones. Una edición
+    puntual publica, vigente ahora, la versión vigente + solo las filas
+    tocadas (keys, tal como quedaron en service_prices; las que ya no
+    existen se quitan). El resto de la hoja, p. ej. la próxima temporada
+    de una versión programada, no se adelanta.
+
+    Sin versión vigente no hace nada: se cotiza con service_prices en vivo.
+    No hace commit.
+    """
+    keys = set(keys)
+    now = datetime.utcnow()
+    active_id = _active_id(db, now) if keys else None
+    if active_id is None:
+        return None
+    db.flush()
+
+    items = {}
+    for item in db.execute(
+        select(
+            PriceVersionItem.service_id,
+            PriceVersionItem.capacidad,
+            PriceVersionItem.period,
+            PriceVersionItem.price_normal,
+            PriceVersionItem.price_discount,
+            PriceVersionItem.price_id,
+        ).where(PriceVersionItem.version_id == active_id)
+    ).mappings():
+        key = (item["service_id"], item["capacidad"], item["period"])
+        if key not in keys:
+            items[key] = dict(item)
+
+    for price in db.execute(
+        select(
+            ServicePrice.service_id,
+            ServicePrice.capacidad,
+            ServicePrice.period,
+            ServicePrice.price_normal,
+            ServicePrice.price_discount,
+            ServicePrice.id.label("price_id"),
+        ).where(ServicePrice.service_id.in_({key[0] for key in keys}), ServicePrice.capacidad.isnot(None))
+    ).mappings():
+        key = (price["service_id"], price["capacidad"], price["period"])
+        if key in keys:
+            items[key] = dict(price)
+
+    version = PriceVersion(label=label, effective_from=now, created_at=now)
+    db.add(version)
+    db.flush()
+    if items:
+        db.execute(insert(PriceVersionItem), [{**item, "version_id": version.id} for item in items.values()])
+
+    table_versions.bump(db, "price_versions")
+    return serialize_version(version, len(items), "active")
+
+
+def list_price_versions(db: Session) -> list:
+    now = datetime.utcnow()
+    counts = dict(
+        db.query(PriceVersionItem.version_id, func.count())
+        .group_by(PriceVersionItem.version_id)
+        .all()
+    )
+    active_id = _active_id(db, now)
+    versions = (
+        db.query(PriceVersion)
+        .order_by(PriceVersion.effective_from.desc(), PriceVersion.id.desc())
+        .all()
+    )
+    return [serialize_version(v, counts.get(v.id, 0), _status(v, active_id, now)) for v in versions]
+
+
+def get_price_version(db: Session, version_id: int) -> dict:
+    version = db.get(PriceVersion, version_id)
+    if not version:
+        raise PriceVersionError(404, "Versión de tarifas no encontrada")
+
+    slugs = dict(db.query(Service.id, Service.slug).all())
+    rows = (
+        db.query(PriceVersionItem)
+        .filter(PriceVersionItem.version_id == version_id)
+        .order_by(PriceVersionItem.service_id, PriceVersionItem.capacidad, PriceVersionItem.period)
+        .all()
+    )
+    now = datetime.utcnow()
+    result = serialize_version(version, len(rows), _status(version, _active_id(db, now), now))
+    result["prices"] = [
+        {
+            "service_id": r.service_id,
+            "service_slug": slugs.get(r.service_id),
+            "capacidad": r.capacidad,
+            "period": r.period,
+            "price_normal": r.price_normal,
+            "price_discount": r.price_discount,
+        }
+        for r in rows
+    ]
+    return result
+
+
+def delete_price_version(db: Session, version_id: int) -> None:
+    """Solo versiones programadas: las que ya rigieron explican órdenes. No hace commit."""
+    version = db.get(PriceVersion, version_id)
+    if not version:
+        raise PriceVersionError(404, "Versión de tarifas no encontrada")
+    if version.effective_from <= datetime.utcnow():
+        raise PriceVersionError(409, "La versión ya entró en vigor; publica una nueva en su lugar")
+
+    db.query(PriceVersionItem).filter(PriceVersionItem.version_id == version_id).delete(synchronize_session=False)
+    db.delete(version)
+    table_versions.bump(db, "price_versions")
+
+
+def explain_order(db: Session, order: Order) -> dict:
+    """
+    Con qué tarifa se cotizó la orden: recotiza con la versión guardada
+    y compara contra el subtotal almacenado.
+    """
+    result = {
+        "order_id": order.id,
+        "price_version_id": order.price_version_id,
+        "capacidadu": order.capacidadu,
+        "duracion": order.duracion,
+        "subtotal": order.subtotal,
+    }
+
+    version = db.get(PriceVersion, order.price_version_id) if order.price_version_id else None
+    if version is None:
+        # Tarifas sin versionar (o subtotal editado a mano): no hay foto que reproducir
+        result["source"] = "unversioned"
+        return result
+
+    service = db.get(Service, order.service_id) if order.service_id else None
+    engine = PricingEngine(db, matrix=PriceMatrix.from_version(db, version, include_inactive=True))
+    period = engine._determine_period(order.duracion or 0.0)
+    quoted, capacidad = (0.0, None)
+    if service:
+        quoted, capacidad = engine.calculate(service.slug, order.capacidadu or 0, order.duracion or 0.0)
+
+    result.update({
+        "source": "version",
+        "version": {
+            "id": version.id,
+            "label": version.label,
+            "effective_from": format_created_at(version.effective_from),
+        },
+        "service_slug": service.slug if service else None,
+        "period": period,
+        "capacidad": capacidad,
+        "quoted_subtotal": quoted,
+        "matches": quoted == order.subtotal,
+    })
+    return result
@@ -1,10 +1,26 @@
-from sqlalchemy import asc
-from app.models import Service, ServicePrice
+from app.services.price_matrix import get_price_matrix
 
 
 class PricingEngine:
-    def __init__(self, db):
+    """
+    at: momento de la cotización (default: ahora). Toma una sola foto de
+    tarifas por instancia, así todo un lote se cotiza con la misma versión.
+    """
+
+    def __init__(self, db, at=None, matrix=None):
         self.db = db
+        self.at = at
+        self._matrix = matrix
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = get_price_matrix(self.db, self.at)
+        return self._matrix
+
+    @property
+    def price_version_id(self):
+        return self.matrix.version_id
 
     # 🔥 Determinar periodo según duración en días
     def _determine_period(self, duracion_horas: float) -> str:
@@ -22,65 +38,44 @@ class PricingEngine:
         except:
             pasajeros = 0
 
-        service = (
-            self.db.query(Service)
-            .filter(Service.slug == service_slug, Service.active == True)
-            .first()
-        )
+        # 🔥 Matriz compilada en memoria (sin round-trips a la DB)
+        service = self.matrix.get(service_slug)
 
         if not service:
             return 0.0, None
 
         period = self._determine_period(duracion_horas)
 
-        # 🔥 Obtener capacidades disponibles
-        capacidades = (
-            self.db.query(ServicePrice.capacidad)
-            .filter(ServicePrice.service_id == service.id)
-            .distinct()
-            .order_by(asc(ServicePrice.capacidad))
-            .all()
-        )
+        # 🔥 Capacidad mínima suficiente + precio exacto + fallbacks fuertes
+        return service.quote(pasajeros, period)
 
-        if not capacidades:
-            return 0.0, None
 
-        capacidades = [c[0] for c in capacidades]
-
-        # 🔥 Asignar capacidad mínima suficiente
-        capacidad_asignada = None
-        for cap in capacidades:
-            if pasajeros <= cap:
-                capacidad_asignada = cap
-                break
-
-        if capacidad_asignada is None:
-            capacidad_asignada = max(capacidades)
-
-        # 🔥 Buscar precio exacto
-        price = (
-            self.db.query(ServicePrice)
-            .filter(
-                ServicePrice.service_id == service.id,
-                ServicePrice.capacidad == capacidad_asignada,
-                ServicePrice.period == period
-            )
-            .first()
-        )
-
-        # 🔥 Fallbacks fuertes
-        if not price:
-            price = (
-                self.db.query(ServicePrice)
-                .filter(
-                    ServicePrice.service_id == service.id,
-                    ServicePrice.capacidad == capacidad_asignada
-                )
-                .order_by(ServicePrice.id.asc())
-                .first()
-            )
-
-        if not price:
-            return 0.0, capacidad_asignada
-
-        return float(price.price_normal or 0.0), capacidad_asignada
\ No newline at end of file
+    def calculate_many(self, items):
+        """
+        Cotiza muchos viajes de una sola pasada sobre la matriz compilada.
+        items: iterable de (service_slug, pasajeros, duracion_horas)
+        Devuelve [(subtotal, capacidad_asignada, period), ...] en el mismo orden.
+        """
+        matrix = self.matrix
+        memo = {}
+        results = []
+
+        for service_slug, pasajeros, duracion_horas in items:
+            try:
+                pasajeros = int(pasajeros)
+            except:
+                pasajeros = 0
+
+            period = self._determine_period(duracion_horas)
+
+            # Las listas de eventos repiten mucho (destino, pax, periodo)
+            key = (service_slug, pasajeros, period)
+            quote = memo.get(key)
+            if quote is None:
+                service = matrix.get(service_slug)
+                quote = service.quote(pasajeros, period) if service else (0.0, None)
+                memo[key] = quote
+
+            results.append((quote[0], quote[1], period))
+
+        return results
@@ -0,0 +1,163 @@
+# app/services/render_executor.py
+"""
+Executor dedicado para el render bloqueante (python-docx, docxcompose,
+LibreOffice) de los endpoints async de /pdf.
+
+Concurrencia acotada + cola de espera acotada: si la cola está llena se
+rechaza de inmediato (503 + Retry-After) en vez de dejar crecer la latencia.
+
+Las exportaciones masivas (/pdf/bulk, /pdf/from-excel-batch) van por un
+carril aparte de baja prioridad: pocas a la vez (las demás 503) y con
+menos hilos que el pool de LibreOffice, así siempre queda al menos un
+worker libre para los renders interactivos.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.services.converter_pool import PDF_POOL_SIZE
+
+# ==== Config ====
+PDF_RENDER_CONCURRENCY = int(os.getenv("PDF_RENDER_CONCURRENCY", str(PDF_POOL_SIZE)))
+PDF_RENDER_QUEUE = int(os.getenv("PDF_RENDER_QUEUE", "8"))
+PDF_RENDER_RETRY_AFTER = int(os.getenv("PDF_RENDER_RETRY_AFTER", "5"))
+# Exportaciones masivas simultáneas y workers que el carril masivo deja libres
+PDF_BULK_EXPORTS = int(os.getenv("PDF_BULK_EXPORTS", "1"))
+PDF_RENDER_RESERVED = int(os.getenv("PDF_RENDER_RESERVED", "1"))
+
+
+class RenderBusy(Exception):
+    def __init__(self, retry_after: int = PDF_RENDER_RETRY_AFTER):
+        super().__init__("Servidor ocupado generando documentos, intenta de nuevo")
+        self.retry_after = retry_after
+
+
+class BulkLane:
+    """Permiso de una exportación masiva; close() lo devuelve (idempotente)."""
+
+    def __init__(self, owner: "RenderExecutor"):
+        self._owner = owner
+        self._closed = False
+        self.concurrency = owner.bulk_concurrency
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self._owner._bulk_executor.submit(fn, *args)
+
+    def close(self) -> None:
+        with self._owner._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._owner.bulk_active -= 1
+        self._owner._bulk_slots.release()
+
+
+class RenderExecutor:
+    def __init__(
+        self,
+        concurrency: int = PDF_RENDER_CONCURRENCY,
+        queue_size: int = PDF_RENDER_QUEUE,
+        bulk_exports: int = PDF_BULK_EXPORTS,
+        reserved: int = PDF_RENDER_RESERVED,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="pdf-render",
+        )
+        # Lugares = ejecutando + esperando
+        self._slots = threading.BoundedSemaphore(self.concurrency + self.queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+        # 🐢 Carril masivo: con un pool de 1 no hay qué reservar
+        self.bulk_exports = max(1, bulk_exports)
+        self.bulk_concurrency = max(1, self.concurrency - max(0, reserved))
+        self._bulk_executor = ThreadPoolExecutor(
+            max_workers=self.bulk_concurrency,
+            thread_name_prefix="pdf-bulk",
+        )
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_exports)
+        self.bulk_active = 0
+        self.bulk_rejected = 0
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderBusy()
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def open_bulk(self) -> BulkLane:
+        if not self._bulk_slots.acquire(blocking=False):
+            with self._lock:
+                self.bulk_rejected += 1
+            raise RenderBusy()
+
+        with self._lock:
+            self.bulk_active += 1
+        return BulkLane(self)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "bulk_exports": self.bulk_exports,
+                "bulk_concurrency": self.bulk_concurrency,
+                "bulk_active": self.bulk_active,
+                "bulk_rejected": self.bulk_rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._bulk_executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: Optional[RenderExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor() -> RenderExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = RenderExecutor()
+    return _executor
+
+
+def shutdown_render_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
@@ -0,0 +1,189 @@
+# app/services/rollup.py
+"""
+Mantenimiento incremental de order_daily_rollup y order_destino_counts.
+
+Cada handler que escribe órdenes toma un snapshot antes y después del
+cambio y aplica la diferencia en la MISMA transacción (antes del commit).
+`python -m app.services.rollup` recalcula la tabla desde cero.
+"""
+from datetime import date
+from typing import Optional, Tuple
+
+from sqlalchemy import func, insert, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Order, OrderDailyRollup, OrderDestinoCount
+
+MEASURES = ("subtotal", "descuento", "total", "abonado", "liquidar")
+
+# (day, service_id, capacidad), (orders, subtotal, descuento, total, abonado, liquidar)
+Daily = Tuple[Tuple[date, int, int], Tuple[float, ...]]
+
+# (aporte diario o None si no tiene created_at, destino)
+Snapshot = Tuple[Optional[Daily], str]
+
+
+def snapshot(order: Optional[Order]) -> Optional[Snapshot]:
+    """Aporte de una orden al rollup (None si no hay orden)."""
+    if order is None:
+        return None
+
+    daily = None
+    if order.created_at is not None:
+        key = (order.created_at.date(), order.service_id or 0, order.capacidadu or 0)
+        values = (1,) + tuple(float(getattr(order, m) or 0) for m in MEASURES)
+        daily = (key, values)
+    return daily, order.dir_destino or ""
+
+
+def _upsert_row(db: Session, model, keys: dict, deltas: dict) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        stmt = None
+
+    if stmt is not None:
+        table = model.__table__
+        stmt = stmt.values(**keys, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: table.c[c] + stmt.excluded[c] for c in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    # Otros motores: update y, si no existía, insert
+    existing = db.get(model, tuple(keys.values()))
+    if existing is None:
+        db.add(model(**keys, **deltas))
+    else:
+        for c, v in deltas.items():
+            setattr(existing, c, getattr(existing, c) + v)
+
+
+def _upsert(db: Session, key, deltas) -> None:
+    day, service_id, capacidad = key
+    _upsert_row(
+        db,
+        OrderDailyRollup,
+        {"day": day, "service_id": service_id, "capacidad": capacidad},
+        dict(zip(("orders",) + MEASURES, deltas)),
+    )
+
+
+def _upsert_destino(db: Session, destino: str, delta: int) -> None:
+    _upsert_row(db, OrderDestinoCount, {"destino": destino}, {"orders": delta})
+
+
+def apply_delta(db: Session, before: Optional[Snapshot], after: Optional[Snapshot]) -> None:
+    """
+    Aplica (after - before) al rollup. No hace commit: va en la
+    transacción del handler.
+    """
+    if before == after:
+        return
+
+    before_daily, before_destino = before if before is not None else (None, None)
+    after_daily, after_destino = after if after is not None else (None, None)
+
+    changes = {}
+    if before_daily is not None:
+        key, values = before_daily
+        changes[key] = tuple(-v for v in values)
+    if after_daily is not None:
+        key, values = after_daily
+        prev = changes.get(key, (0,) * len(values))
+        changes[key] = tuple(p + v for p, v in zip(prev, values))
+
+    for key, deltas in changes.items():
+        if any(deltas):
+            _upsert(db, key, deltas)
+
+    if before_destino != after_destino:
+        if before_destino is not None:
+            _upsert_destino(db, before_destino, -1)
+        if after_destino is not None:
+            _upsert_destino(db, after_destino, 1)
+
+
+def add_orders(db: Session, orders) -> None:
+    """
+    Suma un lote de órdenes nuevas: una sola upsert por
+    (día, servicio, capacidad) en vez de una por orden.
+    """
+    totals = {}
+    destinos = {}
+    for order in orders:
+        snap = snapshot(order)
+        if snap is None:
+            continue
+        daily, destino = snap
+        destinos[destino] = destinos.get(destino, 0) + 1
+        if daily is None:
+            continue
+        key, values = daily
+        prev = totals.get(key)
+        totals[key] = values if prev is None else tuple(p + v for p, v in zip(prev, values))
+
+    for key, deltas in totals.items():
+        _upsert(db, key, deltas)
+    for destino, count in destinos.items():
+        _upsert_destino(db, destino, count)
+
+
+def _destino_source():
+    destino = func.coalesce(Order.dir_destino, "")
+    return select(destino, func.count(Order.id)).group_by(destino)
+
+
+def rebuild(db: Session) -> int:
+    """Recalcula order_daily_rollup y order_destino_counts desde orders. Devuelve filas del rollup."""
+    day = func.date(Order.created_at)
+    service_id = func.coalesce(Order.service_id, 0)
+    capacidad = func.coalesce(Order.capacidadu, 0)
+
+    source = (
+        select(
+            day,
+            service_id,
+            capacidad,
+            func.count(Order.id),
+            *[func.sum(func.coalesce(getattr(Order, m), 0)) for m in MEASURES],
+        )
+        .where(Order.created_at.isnot(None))
+        .group_by(day, service_id, capacidad)
+    )
+
+    db.execute(delete(OrderDailyRollup))
+    db.execute(
+        insert(OrderDailyRollup).from_select(
+            ["day", "service_id", "capacidad", "orders", *MEASURES],
+            source,
+        )
+    )
+    db.execute(delete(OrderDestinoCount))
+    db.execute(insert(OrderDestinoCount).from_select(["destino", "orders"], _destino_source()))
+    db.commit()
+    return db.query(func.count()).select_from(OrderDailyRollup).scalar()
+
+
+def ensure_built(db: Session) -> None:
+    """Primera vez (tabla vacía con órdenes existentes): reconstruye."""
+    if db.query(OrderDailyRollup.day).first() is None and db.query(Order.id).first() is not None:
+        rebuild(db)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.migrations import run_migrations
+
+    run_migrations()
+    session = SessionLocal()
+    try:
+        print(f"✅ Rollup reconstruido: {rebuild(session)} filas")
+    finally:
+        session.close()
@@ -1,4 +1,8 @@
+import threading
 import unicodedata
+from collections import deque
+from typing import Optional
+
 from sqlalchemy.orm import Session
 from app.models import Service
 
@@ -13,30 +17,151 @@ def normalize(text: str) -> str:
     return text
 
 
-def resolve_service(destino: str, db: Session) -> Service:
+class ResolvedService:
+    """Copia ligera de un Service activo (no depende de la sesión)."""
+
+    __slots__ = ("id", "slug", "name")
+
+    def __init__(self, id: int, slug: str, name: str):
+        self.id = id
+        self.slug = slug
+        self.name = name
+
+
+class ServiceIndex:
     """
-    Resolver universal sin depender de columnas extras.
-    Nunca falla.
+    Autómata Aho-Corasick sobre slugs y nombres normalizados de los
+    servicios activos. Resolver un destino es una sola pasada lineal
+    sobre el texto, respetando la prioridad original:
+
+      1️⃣ slug contenido en el destino (primer servicio en orden)
+      2️⃣ nombre contenido en el destino (primer servicio en orden)
+      3️⃣ fallback: primer servicio activo
     """
 
-    destino_norm = normalize(destino)
+    SLUG = 0
+    NAME = 1
+
+    def __init__(self, services):
+        self.services = tuple(services)
+
+        # Nodo 0 = raíz. Cada nodo: transiciones, enlace de fallo y salidas.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        # Patrones vacíos ("" in destino siempre es True)
+        self._always = [None, None]
+
+        for rank, service in enumerate(self.services):
+            self._add(normalize(service.slug), self.SLUG, rank)
+            self._add(normalize(service.name), self.NAME, rank)
+
+        self._build_failure_links()
+
+    def _add(self, pattern: str, kind: int, rank: int) -> None:
+        if not pattern:
+            if self._always[kind] is None:
+                self._always[kind] = rank
+            return
+
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node] += ((kind, rank),)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Hereda las salidas del sufijo más largo
+                self._out[child] += self._out[self._fail[child]]
+
+    def resolve(self, destino: str) -> Optional[ResolvedService]:
+        if not self.services:
+            return None
+
+        best = list(self._always)
 
-    services = db.query(Service).filter(Service.active == True).all()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in normalize(destino):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kind, rank in out[node]:
+                if best[kind] is None or rank < best[kind]:
+                    best[kind] = rank
 
-    # 1️⃣ Match directo por slug
-    for service in services:
-        slug_norm = normalize(service.slug)
-        if slug_norm in destino_norm:
-            return service
+        for kind in (self.SLUG, self.NAME):
+            if best[kind] is not None:
+                return self.services[best[kind]]
 
-    # 2️⃣ Match por nombre
-    for service in services:
-        name_norm = normalize(service.name)
-        if name_norm in destino_norm:
-            return service
+        return self.services[0]
 
-    # 3️⃣ Fallback seguro: primer servicio activo
-    if services:
-        return services[0]
+    @classmethod
+    def from_db(cls, db: Session) -> "ServiceIndex":
+        rows = (
+            db.query(Service.id, Service.slug, Service.name)
+            .filter(Service.active == True)
+            .order_by(Service.id.asc())
+            .all()
+        )
+        return cls(ResolvedService(id, slug, name) for id, slug, name in rows)
 
-    return None
\ No newline at end of file
+
+# ================================
+# Índice compartido (se reconstruye al cambiar servicios)
+# ================================
+_index: Optional[ServiceIndex] = None
+_lock = threading.Lock()
+
+
+def get_service_index(db: Session) -> ServiceIndex:
+    index = _index
+    if index is not None:
+        return index
+    return refresh_service_index(db)
+
+
+def refresh_service_index(db: Session) -> ServiceIndex:
+    global _index
+    with _lock:
+        _index = ServiceIndex.from_db(db)
+        return _index
+
+
+def invalidate_service_index() -> None:
+    global _index
+    _index = None
+
+
+def resolve_service(destino: str, db: Session) -> Optional[ResolvedService]:
+    """
+    Resolver universal sin depender de columnas extras.
+    Nunca falla.
+    """
+    return get_service_index(db).resolve(destino)
+
+
+def resolve_services(destinos, db: Session) -> dict:
+    """
+    Versión por lotes de resolve_service: resuelve cada destino
+    distinto una sola vez. Devuelve {destino: ResolvedService | None}.
+    """
+    index = get_service_index(db)
+    return {destino: index.resolve(destino) for destino in set(destinos)}
@@ -0,0 +1,68 @@
+# app/services/startup_report.py
+"""
+Tiempos del arranque en frío: imports por bloque (mark) y pasos del
+startup (step). Se importa primero en app.main para medir desde ahí.
+"""
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# Módulos que deben cargarse solo al usarse
+HEAVY_MODULES = ("pandas", "docx", "docxcompose", "openpyxl")
+
+_t0 = time.perf_counter()
+_last = _t0
+_imports: List[Tuple[str, float]] = []
+_steps: List[Tuple[str, float]] = []
+_ready_at = None
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def mark(name: str) -> None:
+    """Tiempo de import desde la marca anterior."""
+    global _last
+    now = time.perf_counter()
+    _imports.append((name, _ms(now - _last)))
+    _last = now
+
+
+@contextmanager
+def step(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps.append((name, _ms(time.perf_counter() - start)))
+
+
+def ready() -> None:
+    global _ready_at
+    _ready_at = time.perf_counter()
+
+
+def report() -> dict:
+    imports_ms = sum(ms for _, ms in _imports)
+    startup_ms = sum(ms for _, ms in _steps)
+    return {
+        "imports": [{"name": name, "ms": ms} for name, ms in _imports],
+        "startup": [{"name": name, "ms": ms} for name, ms in _steps],
+        "imports_ms": round(imports_ms, 1),
+        "startup_ms": round(startup_ms, 1),
+        "total_ms": _ms(_ready_at - _t0) if _ready_at is not None else None,
+        "heavy_modules_loaded": {m: m in sys.modules for m in HEAVY_MODULES},
+        "modules": len(sys.modules),
+    }
+
+
+def summary() -> str:
+    data = report()
+    slowest = sorted(_imports + _steps, key=lambda item: item[1], reverse=True)[:3]
+    top = ", ".join(f"{name} {ms:g}ms" for name, ms in slowest)
+    return (
+        f"⏱ Arranque: {data['total_ms']}ms "
+        f"(imports {data['imports_ms']}ms, init {data['startup_ms']}ms; {top})"
+    )
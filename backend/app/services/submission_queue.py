@@ -0,0 +1,232 @@
+# app/services/submission_queue.py
+"""
+Modo "queue" de /orders/form-submit (FORM_SUBMIT_MODE=queue).
+
+El endpoint solo valida y guarda el payload en form_submissions (202 +
+ticket). Un worker en segundo plano drena la cola por lotes: resuelve y
+cotiza todo el lote de una pasada y crea las órdenes con UN commit por
+lote (group commit). En PostgreSQL los lotes se reclaman con
+SKIP LOCKED, así varias réplicas pueden drenar a la vez.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import FormSubmission
+from app.services import rollup, table_versions
+from app.services.order_intake import SubmissionError, build_orders, submission_result
+
+# ==== Config ====
+FORM_SUBMIT_MODE = os.getenv("FORM_SUBMIT_MODE", "sync")   # sync | queue
+FORM_QUEUE_BATCH = int(os.getenv("FORM_QUEUE_BATCH", "200"))
+FORM_QUEUE_POLL = float(os.getenv("FORM_QUEUE_POLL", "1.0"))
+
+
+def queue_enabled() -> bool:
+    return FORM_SUBMIT_MODE == "queue"
+
+
+def enqueue(db: Session, payload: dict) -> FormSubmission:
+    """
+    Agrega el envío a la transacción en curso (flush para tener el
+    ticket). El que llama hace commit y después wake_submission_worker().
+    """
+    submission = FormSubmission(
+        payload=json.dumps(payload, ensure_ascii=False, default=str),
+        status="pending",
+        created_at=datetime.utcnow(),
+    )
+    db.add(submission)
+    db.flush()
+    return submission
+
+
+def wake_submission_worker() -> None:
+    worker = _worker
+    if worker is not None:
+        worker.wake()
+
+
+def ticket_status(submission: FormSubmission) -> dict:
+    data = {
+        "ticket": submission.id,
+        "status": submission.status,
+        "order_id": submission.order_id,
+    }
+    if submission.status == "done" and submission.result:
+        data["result"] = json.loads(submission.result)
+    if submission.status == "error":
+        data["error"] = submission.error
+    return data
+
+
+# ================================
+# Drenado
+# ================================
+
+def _claim(db: Session, limit: int, submission_id: Optional[int] = None) -> List[FormSubmission]:
+    query = db.query(FormSubmission).filter(FormSubmission.status == "pending")
+    if submission_id is not None:
+        query = query.filter(FormSubmission.id == submission_id)
+    query = query.order_by(FormSubmission.id.asc()).limit(limit)
+
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    return query.all()
+
+
+def _process(db: Session, batch: List[FormSubmission]) -> None:
+    """Crea las órdenes del lote. No hace commit."""
+    payloads = []
+    for submission in batch:
+        try:
+            payload = json.loads(submission.payload)
+        except ValueError:
+            payload = None
+        payloads.append(payload if isinstance(payload, dict) else {})
+
+    now = datetime.utcnow()
+    created = []
+    # Tarifa vigente cuando llegó el Form, aunque se drene después
+    quoted_at = [submission.created_at or now for submission in batch]
+    for submission, item in zip(batch, build_orders(db, payloads, quoted_at)):
+        submission.processed_at = now
+        if isinstance(item, SubmissionError):
+            submission.status = "error"
+            submission.error = item.detail
+            continue
+
+        order, service_slug = item
+        # La orden cuenta desde que llegó el Form, no desde que se drenó
+        order.created_at = submission.created_at or now
+        db.add(order)
+        created.append((submission, order, service_slug))
+
+    db.flush()  # ids de las órdenes
+
+    rollup.add_orders(db, [order for _, order, _ in created])
+    if created:
+        table_versions.bump(db, "orders")
+    for submission, order, service_slug in created:
+        submission.status = "done"
+        submission.order_id = order.id
+        submission.result = json.dumps(submission_result(order, service_slug), ensure_ascii=False)
+
+
+def drain_once(db: Session, batch_size: int = FORM_QUEUE_BATCH) -> int:
+    """Procesa un lote de pendientes. Devuelve cuántos envíos tomó."""
+    batch = _claim(db, batch_size)
+    if not batch:
+        db.rollback()
+        return 0
+
+    ids = [submission.id for submission in batch]
+    try:
+        _process(db, batch)
+        db.commit()
+        return len(ids)
+    except Exception:
+        db.rollback()
+
+    # Falló el lote completo: uno por uno para aislar al culpable
+    for submission_id in ids:
+        try:
+            claimed = _claim(db, 1, submission_id)
+            if claimed:
+                _process(db, claimed)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            submission = db.get(FormSubmission, submission_id)
+            if submission is not None and submission.status == "pending":
+                submission.status = "error"
+                submission.error = str(e)[:500]
+                submission.processed_at = datetime.utcnow()
+                db.commit()
+    return len(ids)
+
+
+# ================================
+# Worker
+# ================================
+
+class SubmissionWorker:
+    def __init__(self, batch_size: int = FORM_QUEUE_BATCH, poll_interval: float = FORM_QUEUE_POLL):
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.processed = 0
+        self.batches = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="form-queue", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            taken = 0
+            db = SessionLocal()
+            try:
+                taken = drain_once(db, self.batch_size)
+                if taken:
+                    self.processed += taken
+                    self.batches += 1
+            except Exception as e:
+                self.last_error = str(e)
+            finally:
+                db.close()
+
+            # Lote lleno → probablemente hay más; si no, esperar aviso o poll
+            if taken < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def stats(self) -> dict:
+        return {
+            "mode": FORM_SUBMIT_MODE,
+            "batch_size": self.batch_size,
+            "processed": self.processed,
+            "batches": self.batches,
+            "last_error": self.last_error,
+        }
+
+
+_worker: Optional[SubmissionWorker] = None
+_worker_lock = threading.Lock()
+
+
+def start_submission_worker() -> Optional[SubmissionWorker]:
+    global _worker
+    if not queue_enabled():
+        return None
+    with _worker_lock:
+        if _worker is None:
+            _worker = SubmissionWorker()
+            _worker.start()
+    return _worker
+
+
+def stop_submission_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
@@ -0,0 +1,92 @@
+# app/services/table_versions.py
+"""
+ETags para los GET que el panel consulta seguido.
+
+table_versions guarda un contador por tabla; cada escritura lo
+incrementa (bump) dentro de su misma transacción. El ETag sale de los
+contadores + la ruta y los query params, así que un If-None-Match que
+coincide se responde 304 con una sola lectura por llave primaria, sin
+correr la consulta ni serializar.
+"""
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import TableVersion
+
+VERSIONED_TABLES = ("orders", "services", "service_prices", "price_versions")
+
+# El navegador guarda la respuesta pero siempre revalida con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump(db: Session, *names: str) -> None:
+    """Incrementa los contadores. No hace commit (va en la transacción del que llama)."""
+    names = tuple(dict.fromkeys(names))
+    result = db.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(names))
+        .values(version=TableVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == len(names):
+        return
+
+    # Tabla sin fila todavía (la migración crea las de VERSIONED_TABLES)
+    existing = set(db.execute(select(TableVersion.name).where(TableVersion.name.in_(names))).scalars())
+    for name in names:
+        if name not in existing:
+            db.add(TableVersion(name=name, version=1))
+    db.flush()
+
+
+def current_versions(db: Session, *names: str) -> Dict[str, int]:
+    rows = db.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(names))
+    ).all()
+    versions = dict.fromkeys(names, 0)
+    versions.update({name: version for name, version in rows})
+    return versions
+
+
+def make_etag(request: Request, versions: Dict[str, int]) -> str:
+    # Mismos contadores con otros filtros / página → otro ETag
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha256(f"{request.url.path}?{params}".encode("utf-8")).hexdigest()[:16]
+    counters = "-".join(f"{name}.{versions[name]}" for name in sorted(versions))
+    return f'"{counters}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: W/"x" coincide con "x"
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def conditional_get(request: Request, db: Session, *names: str) -> Tuple[str, Optional[Response]]:
+    """
+    (etag, respuesta 304 o None). Llamar antes de la consulta: si hay
+    una escritura en medio, el ETag queda viejo y el siguiente GET
+    simplemente vuelve a traer los datos.
+    """
+    etag = make_etag(request, current_versions(db, *names))
+    if etag_matches(request, etag):
+        return etag, Response(status_code=304, headers=etag_headers(etag))
+    return etag, None
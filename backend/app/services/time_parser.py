@@ -0,0 +1,103 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+# Los valores del Form se repiten mucho ("08:00", "9:00 am", ...)
+TIME_PARSE_CACHE = int(os.getenv("TIME_PARSE_CACHE", "1024"))
+
+
+def _number(part: str, max_value: int, min_value: int = 0) -> Optional[int]:
+    # 1 o 2 dígitos ASCII (mismo criterio que %H / %I / %M / %S)
+    if not (1 <= len(part) <= 2 and part.isascii() and part.isdigit()):
+        return None
+    value = int(part)
+    if value < min_value or value > max_value:
+        return None
+    return value
+
+
+def _clock(text: str, twelve_hour: bool) -> Optional[int]:
+    """'H', 'H:M' o 'H:M:S' → minutos. Sin sufijo solo se aceptan H:M y H:M:S."""
+    parts = text.split(":")
+    if not (1 <= len(parts) <= 3) or (len(parts) == 1 and not twelve_hour):
+        return None
+
+    hour = _number(parts[0], 12, 1) if twelve_hour else _number(parts[0], 23)
+    minute = _number(parts[1], 59) if len(parts) > 1 else 0
+    second = _number(parts[2], 59) if len(parts) > 2 else 0
+    if hour is None or minute is None or second is None:
+        return None
+    return hour * 60 + minute
+
+
+def _leading_number(text: str) -> Optional[int]:
+    start = 0
+    while start < len(text) and not text[start].isdigit():
+        start += 1
+    end = start
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    return int(text[start:end]) if end > start else None
+
+
+def parse_minutes(value) -> Optional[int]:
+    """
+    Minutos desde medianoche, o None si el formato no se reconoce.
+
+    Acepta lo mismo que el antiguo parse_time de orders:
+    - 24h: '17:30', '9:05', '17:30:00'
+    - 12h: '9 am', '9:00am', '9:00 p.m.', '12:15:00 AM'
+    - sufijo inválido con hora > 12 ('17:33:00 am') → se ignora el sufijo
+    """
+    # Fuera del cache: una lista / dict del JSON no es hasheable
+    if not isinstance(value, str):
+        return None
+    return _parse_minutes_str(value)
+
+
+@lru_cache(maxsize=TIME_PARSE_CACHE)
+def _parse_minutes_str(value: str) -> Optional[int]:
+    raw = value.strip().lower()
+    raw = raw.replace("a.m.", "am").replace("p.m.", "pm").replace(".", "").strip()
+    if not raw:
+        return None
+
+    if "am" in raw or "pm" in raw:
+        # Hora > 12 no puede ser 12h: se trata como 24h sin el sufijo
+        hour = _leading_number(raw)
+        if hour is not None and hour > 12:
+            minutes = _clock(raw.replace("am", "").replace("pm", "").strip(), twelve_hour=False)
+            if minutes is not None:
+                return minutes
+
+        compact = raw.replace(" ", "")
+        suffix = compact[-2:]
+        if suffix in ("am", "pm"):
+            minutes = _clock(compact[:-2], twelve_hour=True)
+            if minutes is not None:
+                minutes %= 12 * 60
+                return minutes + 12 * 60 if suffix == "pm" else minutes
+
+    return _clock(raw, twelve_hour=False)
+
+
+def parse_duracion(hora_ida, hora_regreso) -> Optional[float]:
+    """Horas entre ida y regreso (cruza medianoche). None si alguna no se entiende."""
+    ida = parse_minutes(hora_ida)
+    regreso = parse_minutes(hora_regreso)
+    if ida is None or regreso is None:
+        return None
+
+    minutes = regreso - ida
+    if minutes < 0:
+        minutes += 24 * 60
+    return minutes / 60
+
+
+def duracion_horas(hora_ida, hora_regreso) -> float:
+    """
+    Duración en horas entre dos horas (12h / 24h / am-pm, cruza medianoche).
+    Formato inválido => 0.0 (mismo criterio que /orders/form-submit).
+    """
+    duracion = parse_duracion(hora_ida, hora_regreso)
+    return 0.0 if duracion is None else duracion
@@ -0,0 +1,141 @@
+# benchmarks/order_reads_bench.py
+"""
+Listado de órdenes: ORM + serialize_order + jsonable_encoder + json
+(camino anterior de list_orders) contra columnas como tuplas +
+order_rows_to_dicts + orjson. Mide CPU por fila y pico de memoria
+(tracemalloc) sobre N órdenes en una base SQLite temporal.
+
+Uso (desde backend/):  python -m benchmarks.order_reads_bench [N]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Order
+from app.services.order_reads import ORDER_COLUMNS, order_rows_to_dicts
+
+
+def legacy_serialize_order(o: Order) -> dict:
+    # Copia del serialize_order anterior (referencia)
+    if o.created_at:
+        dt = o.created_at
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        else:
+            dt = dt.astimezone(timezone.utc)
+        created_iso = dt.isoformat(timespec="seconds").replace("+00:00", "Z")
+    else:
+        created_iso = None
+
+    return {
+        "id": o.id,
+        "nombre": o.nombre,
+        "fecha": o.fecha,
+        "dir_salida": o.dir_salida,
+        "dir_destino": o.dir_destino,
+        "hor_ida": o.hor_ida,
+        "hor_regreso": o.hor_regreso,
+        "duracion": o.duracion,
+        "capacidadu": o.capacidadu,
+        "subtotal": o.subtotal,
+        "descuento": o.descuento,
+        "total": o.total,
+        "abonado": o.abonado,
+        "fecha_abono": o.fecha_abono,
+        "liquidar": o.liquidar,
+        "texto_extra": o.texto_extra,
+        "created_at": created_iso,
+    }
+
+
+def legacy(session) -> bytes:
+    orders = session.query(Order).order_by(Order.id.desc()).all()
+    content = jsonable_encoder([legacy_serialize_order(o) for o in orders])
+    # Lo mismo que JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def projected(session) -> bytes:
+    rows = session.query(*ORDER_COLUMNS).order_by(Order.id.desc()).all()
+    return orjson.dumps(order_rows_to_dicts(rows))
+
+
+def seed(engine, n: int) -> None:
+    Base.metadata.create_all(engine)
+    start = datetime(2026, 1, 1, 8, 0)
+    rows = [
+        {
+            "nombre": f"Cliente {i}",
+            "fecha": "2026-05-01",
+            "dir_salida": "Guadalajara",
+            "dir_destino": "Tequila",
+            "hor_ida": "08:00",
+            "hor_regreso": "20:00",
+            "duracion": 12.0,
+            "capacidadu": 14,
+            "subtotal": 4500.0,
+            "descuento": 0.0,
+            "total": 4500.0,
+            "abonado": 1000.0,
+            "liquidar": 3500.0,
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Order), rows)
+
+
+def measure(fn, Session):
+    session = Session()
+    try:
+        gc.collect()
+        t0 = time.perf_counter()
+        body = fn(session)
+        elapsed = time.perf_counter() - t0
+    finally:
+        session.close()
+
+    session = Session()
+    try:
+        gc.collect()
+        tracemalloc.start()
+        fn(session)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        session.close()
+    return body, elapsed, peak
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed(engine, n)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        old_body, old_s, old_peak = measure(legacy, Session)
+        new_body, new_s, new_peak = measure(projected, Session)
+        engine.dispose()
+
+    assert json.loads(old_body) == json.loads(new_body)
+    print(f"{n} órdenes")
+    for name, s, peak in (("ORM + json", old_s, old_peak), ("tuplas + orjson", new_s, new_peak)):
+        print(f"  {name:<16} {s * 1000:8.1f} ms  {s / n * 1e6:6.2f} µs/fila  pico {peak / 1024 / 1024:7.1f} MB")
+    print(f"  CPU x{old_s / new_s:.1f}, memoria x{old_peak / new_peak:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/time_parser_bench.py
+"""
+Microbenchmark: parser de horas actual (tokenizer + LRU) contra el
+parse_time anterior de app/routers/orders.py (regex + strptime).
+
+Uso (desde backend/):  python -m benchmarks.time_parser_bench
+"""
+import re
+import timeit
+from datetime import datetime
+
+from app.services.time_parser import _parse_minutes_str, parse_minutes
+
+# Valores típicos del Form (se repiten mucho) + algunos inválidos
+SAMPLES = [
+    "08:00", "9:00 am", "9:00 a.m.", "17:30", "7:30 PM", "12:00 pm",
+    "17:33:00 am", "06:45", "10 am", "22:15", "5:00pm", "", "mañana",
+]
+
+
+def legacy_parse_time(value: str) -> datetime:
+    # Copia literal del parser anterior (referencia)
+    if not value:
+        raise ValueError("Hora vacía")
+
+    raw = value.strip().lower()
+    raw = raw.replace("a.m.", "am").replace("p.m.", "pm").replace(".", "").strip()
+    has_ampm = ("am" in raw) or ("pm" in raw)
+    time_numbers = re.findall(r"\d+", raw)
+
+    try:
+        hour = int(time_numbers[0])
+        if hour > 12 and has_ampm:
+            raw_24 = re.sub(r"(am|pm)", "", raw).strip()
+            for fmt in ["%H:%M:%S", "%H:%M"]:
+                try:
+                    return datetime.strptime(raw_24, fmt)
+                except:
+                    pass
+    except:
+        pass
+
+    if has_ampm:
+        raw2 = re.sub(r"(am|pm)$", r" \1", raw.replace(" ", ""))
+        for fmt in ["%I:%M:%S %p", "%I:%M %p", "%I %p"]:
+            try:
+                return datetime.strptime(raw2.upper(), fmt)
+            except:
+                pass
+
+    for fmt in ["%H:%M:%S", "%H:%M"]:
+        try:
+            return datetime.strptime(raw, fmt)
+        except:
+            pass
+
+    raise ValueError(f"Formato de hora no reconocido: '{value}'")
+
+
+def legacy(value):
+    try:
+        t = legacy_parse_time(value)
+        return t.hour * 60 + t.minute
+    except ValueError:
+        return None
+
+
+def uncached(value):
+    return _parse_minutes_str.__wrapped__(value) if isinstance(value, str) else None
+
+
+def main(rounds: int = 2000):
+    for value in SAMPLES:
+        assert legacy(value) == parse_minutes(value), value
+
+    results = {}
+    for name, fn in (("parse_time (anterior)", legacy), ("tokenizer sin cache", uncached), ("tokenizer + LRU", parse_minutes)):
+        elapsed = min(timeit.repeat(lambda: [fn(v) for v in SAMPLES], number=rounds, repeat=5))
+        results[name] = elapsed / (rounds * len(SAMPLES)) * 1e6
+
+    base = results["parse_time (anterior)"]
+    for name, us in results.items():
+        print(f"{name:<24} {us:8.3f} µs/valor   x{base / us:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
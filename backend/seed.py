@@ -3,7 +3,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.database import SessionLocal
-from app.models import Service, ServicePrice
+from app.services.price_bulk import apply_price_sheet, rows_from_json
+from app.services.price_versions import publish_changes
 
 SERVICES_DATA = [
 
@@ -219,55 +220,28 @@ SERVICES_DATA = [
 ]
 
 def run():
+    """
+    Crea los servicios y precios que falten (los existentes no se tocan).
+    Mismo camino que PUT /service-prices/bulk: pocas consultas y un commit
+    (y, si ya hay una versión vigente, los precios nuevos se publican encima).
+    """
     db = SessionLocal()
 
     try:
-        for service_data in SERVICES_DATA:
-
-            service = (
-                db.query(Service)
-                .filter(Service.slug == service_data["slug"])
-                .first()
-            )
-
-            if not service:
-                service = Service(
-                    name=service_data["name"],
-                    slug=service_data["slug"],
-                    active=True
-                )
-                db.add(service)
-                db.commit()
-                db.refresh(service)
-                print(f"✔ Servicio creado: {service.slug}")
-
-            for price_data in service_data["prices"]:
-
-                existing = (
-                    db.query(ServicePrice)
-                    .filter(
-                        ServicePrice.service_id == service.id,
-                        ServicePrice.capacidad == price_data["capacidad"],
-                        ServicePrice.period == price_data["period"]
-                    )
-                    .first()
-                )
-
-                if not existing:
-                    price = ServicePrice(
-                        service_id=service.id,
-                        capacidad=price_data["capacidad"],
-                        period=price_data["period"],
-                        price_normal=price_data["price_normal"],
-                        price_discount=0
-                    )
-                    db.add(price)
-                    print(
-                        f"   ➜ Precio agregado: {price_data['capacidad']} pax / {price_data['period']}"
-                    )
-
+        result = apply_price_sheet(
+            db,
+            rows_from_json({"services": SERVICES_DATA}),
+            only_missing=True,
+            create_services=True,
+        )
+        # Con versionado activo lo agregado también tiene que publicarse
+        result["price_version"] = publish_changes(db, "auto: seed", result.pop("changed_keys"))
         db.commit()
+
+        print(f"✔ Servicios creados: {result['services_created']}")
+        print(f"   ➜ Precios agregados: {result['inserted']}")
         print("\n✅ Seed completado correctamente")
+        return result
 
     finally:
         db.close()
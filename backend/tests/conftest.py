@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Base SQLite desechable: la config se lee al importar app.database
+_TMP = tempfile.mkdtemp(prefix="agencia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["PRICE_SNAPSHOT_POLL"] = "0"
+os.environ["FORM_SUBMIT_MODE"] = "sync"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.auth import create_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import PriceVersion, PriceVersionItem, ServicePrice  # noqa: E402
+from app.services.price_matrix import invalidate_price_matrix  # noqa: E402
+
+FORM_API_KEY = {"x-api-key": os.getenv("FORM_API_KEY", "super-secret-key")}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def admin():
+    return {"Authorization": "Bearer " + create_token("admin")}
+
+
+@pytest.fixture(scope="session")
+def form_key():
+    return dict(FORM_API_KEY)
+
+
+@pytest.fixture
+def db(client):
+    # client: el arranque de la app corre las migraciones
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seeded(client):
+    """Tarifas del seed, sin versiones publicadas."""
+    session = SessionLocal()
+    try:
+        session.query(PriceVersionItem).delete()
+        session.query(PriceVersion).delete()
+        session.query(ServicePrice).delete()
+        session.commit()
+    finally:
+        session.close()
+    invalidate_price_matrix()
+    client.post("/seed/prices")
+    yield client
+    invalidate_price_matrix()
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from app.models import IdempotencyKey, Order
+from app.services import idempotency
+from app.services.idempotency import IdempotencyStore, idempotency_key
+
+SUBMISSION = {"personas": 4, "hora_salida": "08:00", "hora_regreso": "20:00", "destino": "tequila"}
+
+
+def _submit(client, form_key, nombre, key=None):
+    headers = {**form_key, **({"Idempotency-Key": key} if key else {})}
+    return client.post("/orders/form-submit", headers=headers, json={**SUBMISSION, "nombre": nombre})
+
+
+def test_key_prefers_header_and_ignores_payload_order():
+    assert idempotency_key("form-submit", "abc", {"a": 1}) == idempotency_key("form-submit", " abc ", {"a": 2})
+    assert idempotency_key("form-submit", None, {"a": 1, "b": 2}) == idempotency_key("form-submit", "", {"b": 2, "a": 1})
+    assert idempotency_key("form-submit", None, {"a": 1}) != idempotency_key("other", None, {"a": 1})
+
+
+def test_memory_is_bounded_lru():
+    store = IdempotencyStore(window_seconds=60, memory_max=2)
+    store.remember("a", 200, {"n": 1})
+    store.remember("b", 200, {"n": 2})
+    store._memory_get("a")
+    store.remember("c", 200, {"n": 3})
+
+    assert store._memory_get("b") is None
+    assert store._memory_get("a") == (200, {"n": 1})
+
+
+def test_expired_row_is_dropped(db):
+    db.add(IdempotencyKey(key="old", status_code=200, response="{}", created_at=datetime.utcnow() - timedelta(days=2)))
+    db.commit()
+
+    assert IdempotencyStore(window_seconds=60).lookup(db, "old") is None
+    db.commit()
+    assert db.get(IdempotencyKey, "old") is None
+
+
+def test_retry_replays_original_response(seeded, form_key, db):
+    first = _submit(seeded, form_key, "retry", key="form-retry-1")
+    before = db.query(Order).count()
+    again = _submit(seeded, form_key, "retry (otro cuerpo)", key="form-retry-1")
+
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["Idempotent-Replay"] == "true"
+    assert db.query(Order).count() == before
+
+
+def test_replay_survives_process_memory(seeded, form_key, monkeypatch):
+    first = _submit(seeded, form_key, "sin header")
+    # Proceso nuevo: la memoria está vacía, responde la tabla
+    monkeypatch.setattr(idempotency, "_store", IdempotencyStore())
+    again = _submit(seeded, form_key, "sin header")
+
+    assert again.json() == first.json()
+    assert idempotency.get_idempotency_store().stats()["db_hits"] == 1
+
+
+def test_concurrent_duplicate_returns_winner(seeded, form_key, db, monkeypatch):
+    store = IdempotencyStore()
+    monkeypatch.setattr(idempotency, "_store", store)
+    key = idempotency_key("form-submit", "race-1", {})
+    real_lookup = store.lookup
+    calls = []
+
+    def lookup(session, k):
+        calls.append(k)
+        if len(calls) == 1:
+            # El otro request hace commit justo después de nuestro lookup
+            db.add(IdempotencyKey(key=key, status_code=200, response='{"order_id": -1}', created_at=datetime.utcnow()))
+            db.commit()
+            return None
+        return real_lookup(session, k)
+
+    monkeypatch.setattr(store, "lookup", lookup)
+    before = db.query(Order).count()
+    r = _submit(seeded, form_key, "carrera", key="race-1")
+
+    assert r.json() == {"order_id": -1}
+    assert r.headers["Idempotent-Replay"] == "true"
+    db.expire_all()
+    assert db.query(Order).count() == before
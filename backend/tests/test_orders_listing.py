@@ -0,0 +1,35 @@
+SUBMISSION = {"personas": 3, "hora_salida": "08:00", "hora_regreso": "14:00", "destino": "tequila zz-listado"}
+
+
+def _ids(response):
+    return [order["id"] for order in response.json()]
+
+
+def test_keyset_pages_cover_every_order_once(seeded, admin, form_key):
+    for i in range(5):
+        seeded.post("/orders/form-submit", headers=form_key, json={**SUBMISSION, "nombre": f"listado {i}"})
+
+    everything = seeded.get("/orders?destino=zz-listado", headers=admin)
+    assert "X-Next-Cursor" not in everything.headers
+    assert len(_ids(everything)) == 5
+
+    pages, cursor = [], None
+    while True:
+        params = f"&cursor={cursor}" if cursor else ""
+        r = seeded.get(f"/orders?destino=zz-listado&limit=2{params}", headers=admin)
+        pages.append(_ids(r))
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert sum(pages, []) == _ids(everything)
+    assert _ids(everything) == sorted(_ids(everything), reverse=True)
+
+
+def test_quote_batch_rejects_non_string_destino(seeded, admin):
+    rows = [{**SUBMISSION, "destino": ["tequila"]}, SUBMISSION]
+    result = seeded.post("/quotes/batch", headers=admin, json={"rows": rows}).json()["rows"]
+
+    assert result[0]["error"] == "destino inválido"
+    assert "error" not in result[1]
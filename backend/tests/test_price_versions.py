@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from app.models import PriceVersionItem, Service, ServicePrice
+from app.services.price_matrix import PriceMatrix, PriceTimeline, get_price_matrix
+
+ROW = {"personas": 5, "hora_salida": "08:00", "hora_regreso": "20:00", "nombre": "x"}
+
+
+def _quote(client, admin, destino):
+    data = client.post("/quotes/batch", headers=admin, json={"rows": [{**ROW, "destino": destino}]}).json()
+    return data["price_version_id"], data["rows"][0]["precio_total"]
+
+
+def _price(db, slug, capacidad, period):
+    return (
+        db.query(ServicePrice)
+        .join(Service, Service.id == ServicePrice.service_id)
+        .filter(Service.slug == slug, ServicePrice.capacidad == capacidad, ServicePrice.period == period)
+        .one()
+    )
+
+
+def _publish(client, admin, **body):
+    r = client.post("/service-prices/versions", headers=admin, json=body)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_edit_without_versions_reads_live(seeded, admin, db):
+    price = _price(db, "mazatlan", 6, "weekend")
+    r = seeded.put(f"/service-prices/{price.id}", headers=admin, json={"price_normal": 12600})
+
+    assert r.status_code == 200
+    assert "X-Price-Version" not in r.headers
+    assert _quote(seeded, admin, "mazatlan") == (None, 12600.0)
+
+
+def test_single_edit_keeps_scheduled_prices_pending(seeded, admin, db):
+    v1 = _publish(seeded, admin, label="v1")
+    assert _quote(seeded, admin, "mazatlan") == (v1["id"], 12500.0)
+
+    # Próxima temporada: la hoja ya la tiene, pero rige en 30 días
+    future = datetime.utcnow() + timedelta(days=30)
+    r = seeded.put(
+        f"/service-prices/bulk?publish=true&effective_from={future.isoformat()}",
+        headers=admin,
+        json={"prices": [{"service_slug": "mazatlan", "capacidad": 6, "period": "weekend", "price_normal": 50000}]},
+    )
+    assert r.json()["price_version"]["status"] == "scheduled"
+
+    # Corrección puntual de otro servicio
+    tequila = _price(db, "tequila", 6, "weekend")
+    r = seeded.put(f"/service-prices/{tequila.id}", headers=admin, json={"price_normal": tequila.price_normal + 100})
+    auto_id = int(r.headers["X-Price-Version"])
+
+    assert _quote(seeded, admin, "mazatlan") == (auto_id, 12500.0)
+    matrix = get_price_matrix(db)
+    assert matrix.version_id == auto_id
+    assert matrix.get("tequila").prices[(6, "weekend")] == tequila.price_normal + 100
+
+    later = get_price_matrix(db, at=future + timedelta(days=1))
+    assert later.get("mazatlan").prices[(6, "weekend")] == 50000
+
+
+def test_auto_publish_copies_active_version_forward(seeded, admin, db):
+    v1 = _publish(seeded, admin, label="v1")
+    price = _price(db, "mazatlan", 6, "long_weekend")
+
+    r = seeded.delete(f"/service-prices/{price.id}", headers=admin)
+    auto_id = int(r.headers["X-Price-Version"])
+
+    assert db.query(PriceVersionItem).filter(PriceVersionItem.version_id == auto_id).count() == v1["items"] - 1
+    assert (6, "long_weekend") not in get_price_matrix(db).get("mazatlan").prices
+
+
+def test_seed_publishes_when_versioned(seeded, admin, db):
+    price = _price(db, "mazatlan", 14, "weekend")
+    seeded.delete(f"/service-prices/{price.id}", headers=admin)
+    _publish(seeded, admin, label="sin 14")
+
+    result = seeded.post("/seed/prices").json()
+
+    assert result["inserted"] == 1
+    assert result["price_version"]["status"] == "active"
+    assert get_price_matrix(db).get("mazatlan").prices[(14, "weekend")] == 17500
+
+
+def test_bulk_dry_run_publishes_nothing(seeded, admin):
+    v1 = _publish(seeded, admin, label="v1")
+    r = seeded.put(
+        "/service-prices/bulk?dry_run=true",
+        headers=admin,
+        json={"prices": [{"service_slug": "mazatlan", "capacidad": 6, "period": "weekend", "price_normal": 1}]},
+    )
+
+    assert r.json()["updated"] == 1
+    assert "changed_keys" not in r.json()
+    assert _quote(seeded, admin, "mazatlan") == (v1["id"], 12500.0)
+
+
+def _matrix(price, version_id, effective_from):
+    return PriceMatrix.compile([(1, "a")], [(1, 6, "weekend", price)], version_id, effective_from)
+
+
+def test_timeline_picks_version_by_effective_date():
+    now = datetime(2026, 1, 1)
+    current = _matrix(100, 1, now - timedelta(days=1))
+    scheduled = _matrix(200, 2, now + timedelta(days=1))
+    timeline = PriceTimeline((current, scheduled), None, {})
+
+    assert timeline.at(now).version_id == 1
+    assert timeline.at(now + timedelta(days=2)).version_id == 2
+    assert timeline.at(now + timedelta(days=2)).get("a").quote(5, "weekend") == (200, 6)
+    # Antes de la vigente no hay foto cargada: snapshot_at va a la DB
+    assert not timeline.covers(now - timedelta(days=2))
+
+
+def test_timeline_without_current_version_uses_live():
+    now = datetime(2026, 1, 1)
+    live = _matrix(50, None, None)
+    timeline = PriceTimeline((_matrix(200, 2, now + timedelta(days=1)),), live, {})
+
+    assert timeline.covers(now - timedelta(days=30))
+    assert timeline.at(now) is live
+    assert timeline.at(now + timedelta(days=2)).version_id == 2
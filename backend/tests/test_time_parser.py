@@ -0,0 +1,34 @@
+import pytest
+
+from app.services.time_parser import duracion_horas, parse_duracion, parse_minutes
+
+
+@pytest.mark.parametrize("value, minutes", [
+    ("17:30", 17 * 60 + 30),
+    ("9:05", 9 * 60 + 5),
+    ("17:30:00", 17 * 60 + 30),
+    ("9 am", 9 * 60),
+    ("9:00am", 9 * 60),
+    ("9:00 p.m.", 21 * 60),
+    ("12:15:00 AM", 15),
+    ("12 pm", 12 * 60),
+    ("17:33:00 am", 17 * 60 + 33),
+    (" 08:00 ", 8 * 60),
+])
+def test_parse_minutes(value, minutes):
+    assert parse_minutes(value) == minutes
+
+
+@pytest.mark.parametrize("value", ["", "25:00", "9", "13 pm", "ocho", "8:60", None, 8, ["08:00"], {"h": 8}])
+def test_parse_minutes_rejects(value):
+    assert parse_minutes(value) is None
+
+
+def test_duracion_crosses_midnight():
+    assert parse_duracion("22:00", "02:30") == 4.5
+    assert parse_duracion("8:00 am", "8:00 pm") == 12
+
+
+def test_duracion_invalid_is_zero():
+    assert parse_duracion("x", "20:00") is None
+    assert duracion_horas(["08:00"], "20:00") == 0.0